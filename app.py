@@ -4,12 +4,35 @@
 # derived columns per row, rep fragment filter, unassigned without duplicates.
 # Modified to upload Master Account List instead of reading from disk.
 
-import hashlib
-from typing import List
+import io
+import os
+from typing import Any, List, Optional, Tuple
 
 import streamlit as st
 import pandas as pd
 
+from cache import FrameCache, content_hash, frame_nbytes
+from delta_store import DEFAULT_STORE_PATH, DeltaStore, batch_id
+from diagnostics import StageTrace, activate, step
+from emails import HASH_MODES, PARALLEL_MIN_KEYS
+from exports import EXPORT_FORMATS, ZIP_MIME, bundle_bytes, export_bytes, export_name, partition_stems
+from jobs import CANCELLED, DONE, Job, JobManager
+from master_index import DEFAULT_INDEX_PATH, MasterIndex
+from pipeline import (
+    DEDUP_FIELDS, DEDUP_PRECEDENCE, DELTA_OUTPUTS, EXCEL_ENGINES, FUZZY_COLS, PARTITION_MODES, READ_MODES,
+    StageRunner, build_fuzzy_index, build_master_slim, classify_rows, combine_activity, dedup_activity, delta_rows,
+    excel_engine, filter_positions, fuzzy_join, join_master, output_columns, parse_rep_frags, partition_manifest,
+    partition_positions, read_tables, split_positions, take_output, template_output, template_rows,
+    uncompacted_nbytes,
+)
+
+FRAME_CACHE_MB = 1024  # parsed uploads + master lookup kept across reruns
+JOB_POLL_SECONDS = 1.0
+# Stages a background job reads or computes (merge_stages()); it is seeded with these only
+MERGE_STAGES = ("master_slim", "normalize", "dedup", "join", "fuzzy_index", "fuzzy", "delta", "delta_output",
+                "classify", "template")
+PREVIEW_ROWS = 25
+
 st.set_page_config(page_title="Unify Engagement — Web Activity + Master Merge", page_icon="🧩", layout="wide")
 st.title("Unify Engagement — Web Activity Merge (Known + Unknown + Intent) with Master Rep Mapping")
 
@@ -36,9 +59,111 @@ with st.sidebar:
         value="",
         help="Filters the Rep Accounts output to accounts whose Current Team - Primary contains any fragment (case-insensitive). Leave blank to include all assigned accounts.",
     )
+    partition_by = st.selectbox(
+        "Per-rep export",
+        PARTITION_MODES,
+        format_func=lambda m: {"none": "Off", "rep": "One file per rep", "fragment": "One file per fragment"}[m],
+        help="Adds a ZIP download with the Rep Accounts output split into one file per rep (or per fragment above), plus a manifest with row and account counts.",
+    )
 
     st.subheader("De-duplication & Normalization")
     normalize_names = st.checkbox("Normalize Account Name (trim, collapse spaces, casefold)", value=True)
+    dedup_rows = st.checkbox(
+        "Remove duplicate activity rows",
+        value=False,
+        help=f"Rows with the same key are kept once, from the first source in {' > '.join(DEDUP_PRECEDENCE)} order.",
+    )
+    dedup_fields = st.multiselect(
+        "Duplicate key",
+        DEDUP_FIELDS,
+        default=DEDUP_FIELDS,
+        disabled=not dedup_rows,
+        help="Compared after normalization (account key; trimmed, casefolded contact and details). Drop contact to collapse the same visit across Known and Intent/Unknown, which have no contact columns.",
+    )
+    fuzzy_match = st.checkbox(
+        "Fuzzy-match accounts missing from the master",
+        value=False,
+        help="Rows whose account has no exact master match are matched by name similarity (e.g. \"Acme Corp.\" vs \"ACME Corporation\"). Adds Match Score and Matched Master Account columns.",
+    )
+    fuzzy_threshold = st.slider("Fuzzy match threshold", min_value=0.5, max_value=1.0, value=0.85, step=0.01,
+                                disabled=not fuzzy_match)
+
+    st.subheader("Master Index")
+    use_master_index = st.checkbox(
+        "Persist master lookup as a local index",
+        value=False,
+        help="Stores the normalized account → rep/industry lookup in a local SQLite file. New master uploads apply only the changed rows; later sessions can run without uploading the master.",
+    )
+    master_index_path = st.text_input("Index file", value=DEFAULT_INDEX_PATH, disabled=not use_master_index)
+
+    st.subheader("Incremental Runs")
+    delta_mode = st.checkbox(
+        "Process only rows not seen in earlier runs",
+        value=False,
+        help="Fingerprints every activity row (source, account, contact, details) against a local store. Rows processed by an earlier run reuse their stored product and emails; only new rows (or rows whose master industry changed) are classified and templated.",
+    )
+    delta_store_path = st.text_input("Row store file", value=DEFAULT_STORE_PATH, disabled=not delta_mode)
+    delta_output = st.selectbox(
+        "Outputs contain",
+        DELTA_OUTPUTS,
+        format_func=lambda m: {"full": "All rows", "delta": "Only rows new since earlier runs"}[m],
+        disabled=not delta_mode,
+    )
+
+    st.subheader("Email Generation")
+    hash_mode = st.selectbox(
+        "Template variant hashing",
+        HASH_MODES,
+        index=0,
+        help="sha256 picks the same template variants as previously generated emails; fast uses a cheaper stable hash (different variants).",
+    )
+    email_workers = st.number_input(
+        "Worker processes", min_value=1, max_value=os.cpu_count() or 1, value=1, step=1,
+        help="Renders subject lines and email bodies on several cores for large runs. The output is identical to a single process.",
+    )
+    parallel_min_keys = st.number_input(
+        "Parallel above N distinct emails", min_value=0, value=PARALLEL_MIN_KEYS, step=10_000,
+        disabled=email_workers == 1,
+        help="Smaller runs stay in one process; starting the pool costs more than it saves.",
+    )
+    lazy_emails = st.checkbox(
+        "Generate emails only for previewed and exported rows",
+        value=False,
+        disabled=delta_mode,
+        help="Skips rendering subject lines and email bodies for every merged row: previews render only the visible page, and the full outputs are rendered when downloads are prepared (after the rep filter).",
+    )
+
+    st.subheader("Memory")
+    compact = st.checkbox(
+        "Compact-memory mode",
+        value=False,
+        help="Parses only the mapped columns and stores repeated text (sources, reps, products, generated emails) once per distinct value. Changing a column mapping re-reads the files.",
+    )
+
+    st.subheader("File Reading")
+    read_mode = st.selectbox(
+        "Parse uploads in parallel",
+        READ_MODES,
+        format_func=lambda m: {"threads": "Threads", "processes": "Processes", "sequential": "Off (one by one)"}[m],
+        help="Parses the uploaded files concurrently. Processes help most with several large XLSX files.",
+    )
+    excel_engine_choice = st.selectbox(
+        "Excel reader",
+        EXCEL_ENGINES,
+        help="calamine is a much faster XLSX parser (requires the python-calamine package); falls back to openpyxl when it is unavailable or cannot read a workbook.",
+    )
+
+    st.subheader("Background Jobs")
+    background = st.checkbox(
+        "Run the merge as a background job",
+        value=False,
+        help="Merge, classification and templating run on a worker thread with progress (rows, stage, ETA) and can be cancelled. Finished results are kept, so a refresh or a widget change that leads back to the same inputs picks them up instead of recomputing.",
+    )
+
+    st.subheader("Diagnostics")
+    show_diagnostics = st.checkbox("Show stage timings", value=False,
+                                   help="Per-stage wall time and row counts for this run, downloadable as JSON and logged as one structured line.")
+    track_memory = st.checkbox("Track memory per stage (slower)", value=False, disabled=not show_diagnostics)
 
 st.write("Upload the four files: Known Activity, Unknown Activity, Intent, and Master Account List.")
 
@@ -58,428 +183,413 @@ with col4:
 # -----------------------------
 # Utilities
 # -----------------------------
-def safe_str(x) -> str:
-    try:
-        return "" if pd.isna(x) else str(x).strip()
-    except Exception:
-        return "" if x is None else str(x).strip()
-
-def read_any(file) -> pd.DataFrame:
-    if file is None:
-        return pd.DataFrame()
-    name = file.name.lower()
-    if name.endswith(".csv"):
-        df = pd.read_csv(file)
+@st.cache_resource
+def _frame_cache() -> FrameCache:
+    return FrameCache(max_bytes=FRAME_CACHE_MB * 1024 * 1024)
+
+@st.cache_resource
+def _job_manager() -> JobManager:
+    # Shared across sessions, so jobs survive a browser refresh
+    return JobManager()
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_panel(jobs: JobManager, key: str, run_job) -> None:
+    # Progress of a background job, polled until it finishes (then the whole page reruns)
+    job = jobs.get(key)
+    if job is None or job.status == DONE:
+        st.rerun()
+    if job.active:
+        done, total = job.rows_done, job.rows_total
+        eta = job.eta_seconds()
+        text = " · ".join([job.stage or "Queued", *([f"{done:,} / {total:,} rows"] if total else []),
+                           f"{job.elapsed_seconds():.0f}s elapsed",
+                           *([f"~{eta:.0f}s left in this stage"] if eta is not None else [])])
+        st.progress(min(done / total, 1.0) if total else 0.0, text=text)
+        if job.cancel_requested.is_set():
+            st.caption("Cancelling after the current step…")
+        elif st.button("Cancel job"):
+            job.cancel()
+        return
+    if job.status == CANCELLED:
+        st.warning("The background job was cancelled. Completed stages are kept and will not be recomputed.")
     else:
-        df = pd.read_excel(file)
-    # Attach origin filename
-    df["Origin File"] = file.name
-    return df
-
-def norm_account(x: str) -> str:
-    s = safe_str(x)
-    if normalize_names:
-        s = " ".join(s.split()).casefold()
-    return s
-
-def product_from_details(details: str) -> str:
-    d = safe_str(details).lower()
-    eam_triggers = [
-        "eam", "asset management", "hxgn eam", "hxgn-eam", "enterprise-asset-management",
-        "maintenance", "equipment management", "preventative maintenance", "asset data"
-    ]
-    if any(t in d for t in eam_triggers):
-        return "HxGN EAM/APM"
-    if ("asset performance" in d) or ("apm" in d):
-        return "HxGN APM"
-    if any(t in d for t in ["quality", "etq", "qms", "compliance"]):
-        return "ETQ"
-    if any(t in d for t in ["project-management", "controls", "ecosys"]):
-        return "Ecosys"
-    if "measuring-machines" in d:
-        return "Scanner"
-    if "cadworx" in d:
-        return "CADWorx"
-    if "caesar" in d:
-        return "CAESAR II"
-    if any(t in d for t in ["productivity-and-efficiency", "digital transformation"]):
-        return "J5/AKMS"
-    if "acceleratorkms" in d:
-        return "AKMS"
-    return "N/A"
-
-def norm_industry(text: str) -> str:
-    s = safe_str(text).lower()
-    if any(k in s for k in ["aerospace", "defense"]): return "aerospace"
-    if any(k in s for k in ["automotive", "vehicle", "mobility"]): return "automotive"
-    if any(k in s for k in ["oil", "gas", "o&g", "energy", "upstream", "midstream", "downstream", "refining"]): return "energy"
-    if any(k in s for k in ["life science", "pharma", "biotech", "medical"]): return "lifesciences"
-    if any(k in s for k in ["food", "beverage", "f&b"]): return "foodbev"
-    if any(k in s for k in ["chem", "petrochem"]): return "chemicals"
-    if any(k in s for k in ["utilities", "power", "generation", "transmission", "distribution"]): return "utilities"
-    if any(k in s for k in ["mining", "metals"]): return "mining"
-    if any(k in s for k in ["electronics", "semiconductor", "high-tech", "hi tech", "hitech"]): return "hitech"
-    if any(k in s for k in ["discrete", "machinery", "heavy", "industrial"]): return "discrete"
-    if s: return "other"
-    return "discrete"  # default
-
-def role_category(title: str) -> str:
-    t = safe_str(title).lower()
-    if any(k in t for k in ["chief ", "cxo", "ceo", "cfo", "coo", "cio", "cto", "ciso", "president"]):
-        return "exec"
-    if any(k in t for k in ["svp", "evp"]): return "exec"
-    if "vice president" in t or "vp" in t: return "vp"
-    if "director" in t: return "director"
-    if any(k in t for k in ["quality", "compliance", "qms", "regulatory"]): return "quality"
-    if any(k in t for k in ["maintenance", "reliability", "asset", "condition monitoring"]): return "maintenance"
-    if any(k in t for k in ["project controls", "project manager", "program manager", "pmo"]): return "projects"
-    if any(k in t for k in ["operations", "manufacturing", "plant manager", "production"]): return "operations"
-    if any(k in t for k in ["engineering", "design", "cad", "piping"]): return "engineering"
-    if any(k in t for k in ["ehs", "hse", "safety"]): return "safety"
-    if any(k in t for k in ["it ", "ot ", "information technology", "industrial it", "systems", "data"]): return "it"
-    if any(k in t for k in ["manager", "lead", "head"]): return "manager"
-    return "ic"
-
-def deterministic_pick(key: str, n: int) -> int:
-    if n <= 0: return 0
-    h = hashlib.sha256(key.encode("utf-8")).hexdigest()
-    return int(h[:8], 16) % n
-
-SUBJECT_THEMES = {
-    "maintenance": {
-        "discrete": [
-            "Cut unplanned downtime on the line with {product}",
-            "Stabilize asset uptime in discrete manufacturing with {product}",
-            "Fewer surprises on critical equipment — {product}"
-        ],
-        "aerospace": [
-            "Improve fleet & ground asset uptime — {product}",
-            "Maintenance leaders in A&D: reduce reactive work with {product}",
-            "A&D uptime without extra headcount — {product}"
-        ],
-        "default": [
-            "Improve asset reliability with {product}",
-            "Cut unplanned downtime — {product}",
-            "Predictable performance from critical assets — {product}"
-        ]
-    },
-    "quality": {
-        "default": [
-            "Faster quality cycles & cleaner audits — {product}",
-            "Reduce compliance friction with {product}",
-            "Make quality predictable with {product}"
-        ]
-    },
-    "projects": {
-        "default": [
-            "Project controls that hold the line — {product}",
-            "Stop late surprises in cost & schedule — {product}",
-            "Forecast accuracy that sticks — {product}"
-        ]
-    },
-    "operations": {
-        "default": [
-            "Make operations predictable with {product}",
-            "Control variability across shifts — {product}",
-            "Fewer bottlenecks, clearer flow — {product}"
-        ]
-    },
-    "engineering": {
-        "default": [
-            "Deliver designs faster with {product}",
-            "Reduce rework & surprises — {product}",
-            "Cleaner models, cleaner handoffs — {product}"
-        ]
-    },
-    "safety": {
-        "default": [
-            "Lower incident risk without slowing the line — {product}",
-            "Simplify compliance and improve safety — {product}",
-            "Fewer near-misses with better visibility — {product}"
-        ]
-    },
-    "it": {
-        "default": [
-            "Less tool sprawl, clearer outcomes — {product}",
-            "Integrations without the drag — {product}",
-            "Operate with a simpler stack — {product}"
-        ]
-    },
-    "vp": {
-        "default": [
-            "Improve predictability without adding complexity — {product}",
-            "Visibility you can act on — {product}",
-            "Hold the line on margin with {product}"
-        ]
-    },
-    "exec": {
-        "default": [
-            "Improve margin predictability with {product}",
-            "Operational confidence across sites — {product}",
-            "Clarity on reliability, quality & cost — {product}"
-        ]
-    },
-    "director": {
-        "default": [
-            "Boost cross-team visibility — {product}",
-            "Make execution repeatable with {product}",
-            "Fewer fires, more follow-through — {product}"
-        ]
-    },
-    "manager": {
-        "default": [
-            "Hit targets with less churn — {product}",
-            "Keep teams moving in the same direction — {product}",
-            "Less busywork, more progress — {product}"
-        ]
-    },
-    "ic": {
-        "default": [
-            "Remove busywork and move faster — {product}",
-            "Make work easier with {product}",
-            "Clarity to execute — {product}"
-        ]
-    }
-}
-
-ROLE_P1 = {
-    "maintenance": ["You’re asked to keep uptime high with constrained headcount.", "Manual PMs miss early failure signals."],
-    "quality": ["Audits and deviations slow teams down.", "Teams chase documents across silos."],
-    "projects": ["Forecast accuracy slips as change orders stack up.", "Cost control is fragile without a clear source of truth."],
-    "operations": ["Throughput swings with schedule volatility.", "Firefighting replaces flow when visibility is late."],
-    "engineering": ["Late clashes force expensive changes.", "Design cycles stretch when models aren’t aligned."],
-    "safety": ["Incidents rise when reporting is fragmented.", "Compliance pulls time from proactive safety work."],
-    "it": ["Integrations inflate cost while ops still lack clear signal.", "Maintaining brittle connections slows initiatives."],
-    "vp": ["Hard to improve predictability without adding complexity.", "Targets compete without clear visibility."],
-    "exec": ["Board-level targets require repeatable execution.", "Confidence erodes when risk is invisible until late."],
-    "director": ["Cross-team consistency is hard without bureaucracy.", "Leaders end up firefighting instead of driving change."],
-    "manager": ["Coordinating under pressure leads to churn and misses.", "Getting consistent execution is hard."],
-    "ic": ["Disconnected tools slow delivery.", "Workarounds pile up when process isn’t clear."]
-}
-ROLE_P2 = {
-    "maintenance": ["Left unresolved, it drives firefighting and lost production.", "The cost shows up as overtime and missed targets."],
-    "quality": ["Unresolved, it prolongs investigations and risks customer trust.", "It becomes margin drag through scrap and rework."],
-    "projects": ["Unresolved, it erodes margin and forces late cuts.", "It leads to unpredictable forecasts."],
-    "operations": ["Unresolved, it causes schedule misses and unstable output.", "It keeps teams reactive."],
-    "engineering": ["Unresolved, it creates rework and missed launch milestones.", "It adds expensive late fixes."],
-    "safety": ["Unresolved, it elevates risk and drags productivity.", "It exposes the business to incidents."],
-    "it": ["Unresolved, it inflates TCO and stalls initiatives.", "Unresolved, it creates shadow IT."],
-    "vp": ["Unresolved, it clouds forecasting and compresses margins.", "It makes planning fragile."],
-    "exec": ["Unresolved, it undermines predictability and confidence.", "It leaves strategy vulnerable."],
-    "director": ["Unresolved, it blocks visibility and creates fires.", "It derails roadmaps."],
-    "manager": ["Unresolved, it causes churn and KPI misses.", "It makes it hard to coach."],
-    "ic": ["Unresolved, it adds busywork and slows delivery.", "It keeps the signal buried in noise."]
-}
-
-PRODUCT_P3 = {
-    "HxGN EAM/APM": ["Move to predictable uptime: connected asset data, prioritized work.", "Earlier signals, planned interventions, extended asset life."],
-    "HxGN APM": ["Spot risks earlier and act before failures.", "Reliability gains from early detection."],
-    "ETQ": ["Faster closings, automated evidence, and cleaner audits.", "Quality that flows without delays."],
-    "Ecosys": ["Project controls that hold the line.", "See slippage sooner and act with confidence."],
-    "Scanner": ["Quicker inspections and faster issue detection.", "Close the loop faster between measurement and correction."],
-    "CADWorx": ["Fewer clashes and faster design cycles.", "Intelligent models reduce rework."],
-    "CAESAR II": ["Trusted stress analysis for safer designs.", "Decisions backed by industry-standard analysis."],
-    "J5/AKMS": ["Standardize shift handover and logs.", "Create operational clarity across teams."],
-    "AKMS": ["Codify best practices and reduce error.", "Make procedures easy to follow and auditable."],
-    "N/A": ["Clearer execution and measurable outcomes.", "Predictability without adding complexity."]
-}
-PRODUCT_P3_VERB = {
-    "HxGN EAM/APM": ["move from reactive to reliable", "plan work before it breaks"],
-    "HxGN APM": ["act before failures", "prioritize by risk"],
-    "ETQ": ["cut audit drag", "shorten quality cycles"],
-    "Ecosys": ["hold the line on cost", "forecast with confidence"],
-    "Scanner": ["speed up inspection", "catch issues earlier"],
-    "CADWorx": ["deliver designs faster", "reduce rework"],
-    "CAESAR II": ["de-risk piping decisions", "accelerate approvals"],
-    "J5/AKMS": ["standardize operations", "create transparency across shifts"],
-    "AKMS": ["codify procedures", "reduce human-factor errors"],
-    "N/A": ["improve execution", "create clarity"]
-}
-CTA_P4 = [
-    "Would a 20-minute discussion next week be useful to compare how others in {industry} approach this?",
-    "Open to a brief session next week to benchmark {industry} peers and quantify impact?",
-    "Would a quick 20-min chat help explore where {product} could remove friction in {industry}?"
-]
-
-def subject_line(product: str, title: str, industry_norm: str, account: str) -> str:
-    a = safe_str(account)
-    t = safe_str(title)
-    p = safe_str(product)
-    ind = safe_str(industry_norm)
-    cat = role_category(t)
-    pool = SUBJECT_THEMES.get(cat, SUBJECT_THEMES["ic"])
-    choices = pool.get(ind, pool.get("default", ["Improve performance with {product}"]))
-    idx = deterministic_pick(a + t + p, len(choices))
-    return choices[idx].format(product=p)
-
-def build_email_body(first: str, title: str, account: str, product: str, details: str, industry_norm: str) -> str:
-    fn = safe_str(first).title()
-    ttl = safe_str(title)
-    acct = safe_str(account)
-    prod = safe_str(product)
-    det = safe_str(details) or "the page you explored"
-    ind_read = {
-        "discrete": "discrete manufacturing",
-        "aerospace": "aerospace & defense",
-        "energy": "energy / oil & gas",
-        "lifesciences": "life sciences",
-        "foodbev": "food & beverage",
-        "chemicals": "chemicals",
-        "utilities": "utilities",
-        "mining": "mining & metals",
-        "hitech": "electronics / high-tech",
-        "other": "your industry"
-    }.get(industry_norm or "discrete", "your industry")
-
-    cat = role_category(ttl)
-    p1_choices = ROLE_P1.get(cat, ROLE_P1["ic"])
-    p2_choices = ROLE_P2.get(cat, ROLE_P2["ic"])
-    p3_choices = PRODUCT_P3.get(prod, PRODUCT_P3["N/A"])
-    verb_choices = PRODUCT_P3_VERB.get(prod, PRODUCT_P3_VERB["N/A"])
-
-    i1 = deterministic_pick(acct + "p1", len(p1_choices))
-    i2 = deterministic_pick(acct + "p2", len(p2_choices))
-    i3 = deterministic_pick(acct + "p3", len(p3_choices))
-    i4 = deterministic_pick(acct + "v", len(verb_choices))
-    i5 = deterministic_pick(acct + "cta", len(CTA_P4))
-
-    greeting = f"Hi {fn}," if fn else "Hello,"
-    para1 = f"{greeting} as a {ttl or 'professional'} at {acct}, teams often face the same challenge: {p1_choices[i1]}"
-    para2 = f"{p2_choices[i2]} Leaders we work with in {ind_read} want fewer surprises and clearer signal."
-    para3 = f"{p3_choices[i3]} In short, {verb_choices[i4]} without adding complexity."
-    para4 = CTA_P4[i5].format(industry=ind_read, product=prod) + f" I can tailor it to your context and the interest we saw around \"{det}\"."
-
-    signature = (
-        "—\n"
-        "Best regards,\n"
-        "<Your Name>\n"
-        "Hexagon\n"
-        "<Phone> | <Email>"
-    )
-
-    return "\n\n".join([para1, para2, para3, para4, signature])
-
-if all([f_known, f_unknown, f_intent, f_master]):
-    # Read activity files
-    df_known = read_any(f_known)
-    df_unknown = read_any(f_unknown)
-    df_intent = read_any(f_intent)
-    master = read_any(f_master)
-
-    df_known["__Source__"] = "Known"
-    df_unknown["__Source__"] = "Unknown"
-    df_intent["__Source__"] = "Intent"
-
-    # Concat all activity, with First/Last/Title only in known (NaN elsewhere)
-    activity = pd.concat([df_known, df_unknown, df_intent], ignore_index=True, sort=False)
+        st.error(f"The background job failed: {job.error}")
+    if st.button("Restart job"):
+        jobs.submit(key, run_job, restart=True)
+        st.rerun()
+
+def upload_hashes(files: List[Any]) -> List[str]:
+    # Content hash per upload, computed once per uploaded file: memoized by the uploader's
+    # file_id (new for every upload), so reruns don't re-hash unchanged files. Only the
+    # current uploads' hashes are kept.
+    memo = st.session_state.get("upload_hashes", {})
+    hashes = {f.file_id: memo.get(f.file_id) or content_hash(f.getvalue()) for f in files}
+    st.session_state["upload_hashes"] = hashes
+    return [hashes[f.file_id] for f in files]
+
+def read_uploads(uploads: List[Tuple[Any, str, Optional[List[str]]]]) -> Tuple[List[pd.DataFrame], pd.DataFrame]:
+    # (file, content hash, usecols) per upload. Uploads missing from the frame cache are parsed
+    # concurrently. Returns the frames plus a per-file report (parser, parse seconds, rows, parsed/cached).
+    cache = _frame_cache()
+    timings = st.session_state.setdefault("parse_timings", {})
+    keys = [("upload", f.name, h, tuple(usecols) if usecols else None,
+             excel_engine(excel_engine_choice)) for f, h, usecols in uploads]
+    with step("read uploads") as rec:
+        frames = [cache.get(key) for key in keys]
+        todo = [i for i, df in enumerate(frames) if df is None]
+        jobs = [(io.BytesIO(uploads[i][0].getvalue()), uploads[i][0].name, uploads[i][2]) for i in todo]
+        for i, (df, seconds, parser) in zip(todo, read_tables(jobs, compact, excel_engine_choice, read_mode)):
+            cache.put(keys[i], df)
+            frames[i] = df.copy(deep=False)
+            timings[keys[i]] = {"file": uploads[i][0].name, "parser": parser, "seconds": seconds, "rows": len(df)}
+        report = []
+        for i, key in enumerate(keys):
+            info = dict(timings.get(key, {"file": key[1], "parser": "", "seconds": None, "rows": len(frames[i])}))
+            info["status"] = "parsed" if i in todo else "cached"
+            report.append(info)
+            if trace is not None:
+                trace.record(f"read {info['file']}", info["seconds"] if i in todo else 0.0, info["rows"], info["status"])
+        rec["rows_out"] = sum(len(df) for df in frames)
+    return frames, pd.DataFrame(report)
+
+master_index = MasterIndex(master_index_path) if use_master_index else None
+index_ready = master_index is not None and master_index.exists()
+
+trace = StageTrace(track_memory) if show_diagnostics else None
+activate(trace)
+
+if all([f_known, f_unknown, f_intent]) and (f_master or index_ready):
+    # Read activity files (cached by content hash); compact mode parses only the mapped columns
+    activity_usecols = [col_account, col_details, col_first, col_last, col_title] if compact else None
+    files = [f for f in [f_known, f_unknown, f_intent, f_master] if f is not None]
+    hashes = upload_hashes(files)
+    uploads = [(f, h, activity_usecols) for f, h in zip(files[:3], hashes)]
+    if f_master is not None:
+        uploads.append((f_master, hashes[3], [master_account_col, master_rep_col, master_ind_col] if compact else None))
+    (df_known, df_unknown, df_intent, *master_frames), parse_report = read_uploads(uploads)
+    file_keys = tuple(hashes[:3])
+    if f_master is not None:
+        master = master_frames[0]
+        master_key = hashes[3]
+        master_columns = set(master.columns)
+    else:
+        # No upload: the persisted index stands in for the master
+        index_meta = master_index.meta()
+        master_columns = {master_account_col, index_meta["rep_col"], index_meta.get("ind_col", "")}
+        if not master_index.matches(master_rep_col, index_meta.get("ind_col"), normalize_names):
+            st.error(
+                f"The master index at {master_index_path} was built with rep column \"{index_meta['rep_col']}\" "
+                f"and name normalization {'on' if index_meta['normalize_names'] == 'True' else 'off'}. "
+                "Upload the Master Account List to rebuild it for the current settings."
+            )
+            st.stop()
 
     # Validate required columns in activity
-    missing_act = [c for c in [col_account, col_details] if c not in activity.columns]
+    activity_cols = set(df_known.columns) | set(df_unknown.columns) | set(df_intent.columns)
+    missing_act = [c for c in [col_account, col_details] if c not in activity_cols]
     if missing_act:
         st.error(f"Activity file(s) missing required column(s): {', '.join(missing_act)}")
     else:
         # Validate master columns
-        missing_master = [c for c in [master_account_col, master_rep_col] if c not in master.columns]
+        missing_master = [c for c in [master_account_col, master_rep_col] if c not in master_columns]
         if missing_master:
             st.error(f"Master file missing required column(s): {', '.join(missing_master)}")
             st.stop()
 
-        # Normalize keys
-        activity["__acct_key__"] = activity[col_account].apply(norm_account)
-        master["__acct_key__"] = master[master_account_col].apply(norm_account)
-
-        # Merge rep and industry from master (left join, so unmatched get NaN)
         merge_cols = [master_rep_col]
-        if master_ind_col in master.columns:
+        if master_ind_col in master_columns:
             merge_cols.append(master_ind_col)
-        master_slim = master[["__acct_key__"] + merge_cols].drop_duplicates(subset="__acct_key__")
-        merged = activity.merge(master_slim, on="__acct_key__", how="left")
-
-        # Fill NaNs for output
-        for c in [col_first, col_last, col_title]:
-            if c in merged.columns:
-                merged[c] = merged[c].fillna("")
-
-        # Derived columns per row
-        merged["Product Solution"] = merged[col_details].apply(product_from_details)
-        merged["Industry Norm"] = merged.get(master_ind_col, "").apply(norm_industry)  # for internal use
-
-        # Compute Subject and Email per row
-        merged["Subject Line"] = merged.apply(
-            lambda r: subject_line(
-                r["Product Solution"],
-                r.get(col_title, ""),
-                r["Industry Norm"],
-                r[col_account]
-            ),
-            axis=1
-        )
-        merged["Email Body"] = merged.apply(
-            lambda r: build_email_body(
-                r.get(col_first, ""),
-                r.get(col_title, ""),
-                r[col_account],
-                r["Product Solution"],
-                r[col_details],
-                r["Industry Norm"]
-            ),
-            axis=1
-        )
-
-        # Assigned: rep not blank/NaN
-        merged[master_rep_col] = merged[master_rep_col].fillna("")
-        merged["Assigned"] = merged[master_rep_col].astype(bool)
-
-        # Split
-        with_rep = merged[merged["Assigned"]].copy()
-        without_rep = merged[~merged["Assigned"]].copy()
-
-        # Rep fragments filter (case-insensitive partial match)
-        frags = [f.strip().lower() for f in rep_frags.split(",") if f.strip()]
-        if frags:
-            mask = with_rep[master_rep_col].str.lower().apply(lambda s: any(f in s for f in frags))
-            with_rep = with_rep[mask]
-
-        # Sort by Account Name
-        with_rep = with_rep.sort_values(col_account)
-        without_rep = without_rep.sort_values(col_account)
-
-        # Final columns (Current Team - Primary is master_rep_col, blanks where appropriate)
-        out_cols = [master_rep_col, col_account, col_first, col_last, col_title, col_details,
-                    "Product Solution", "Subject Line", "Email Body", "Origin File"]
-
-        # Filter to existing columns
-        with_rep_out = with_rep[[c for c in out_cols if c in with_rep.columns]]
-        without_rep_out = without_rep[[c for c in out_cols if c in without_rep.columns]]
+        ind_col = master_ind_col if master_ind_col in merge_cols else None
+        out_cols = output_columns(master_rep_col, col_account, col_first, col_last, col_title, col_details)
+        if fuzzy_match:
+            out_cols += FUZZY_COLS
+        blank_cols = [col_first, col_last, col_title]
+
+        # Each stage declares its inputs; only stages whose inputs changed are recomputed
+        store = st.session_state.setdefault("pipeline_stages", {})
+        runner = StageRunner(store)
+        if f_master is not None:
+            slim_key = ("master_slim", master_key, master_account_col, tuple(merge_cols), normalize_names, compact)
+            master_slim = runner.run("master_slim", slim_key, lambda: _frame_cache().get_or_compute(
+                slim_key, lambda: build_master_slim(master, master_account_col, merge_cols, normalize_names)))
+            if master_index is not None:
+                meta = master_index.meta()
+                if meta.get("source_hash") != master_key or not master_index.matches(master_rep_col, ind_col, normalize_names):
+                    diff = master_index.refresh(master_slim, master_rep_col, ind_col, normalize_names, master_key)
+                    st.session_state["master_index_diff"] = diff
+        else:
+            slim_key = ("master_index", master_index_path, index_meta["updated_at"], index_meta["source_hash"])
+            runner.run("master_slim", slim_key, lambda: _frame_cache().get_or_compute(slim_key, master_index.load))
+        email_inputs = (col_first, col_title, col_account, col_details, hash_mode, compact)
+        lazy_emails = lazy_emails and not delta_mode
+
+        def merge_stages(runner: StageRunner) -> Tuple[pd.DataFrame, str, Optional[int], Any, Any, Any]:
+            # normalize -> [dedup] -> join -> [fuzzy] -> classify -> template (or delta). Runs in
+            # the script, or on a background job's runner; returns (merged, its stage name,
+            # distinct email keys, fuzzy hits, duplicates removed, delta counts)
+            activity = runner.run("normalize", (file_keys, activity_usecols, col_account, normalize_names, compact),
+                                  lambda: combine_activity(df_known, df_unknown, df_intent, col_account,
+                                                           normalize_names, compact))
+            activity_stage, dedup_removed, fuzzy_hits, delta_counts = "normalize", None, None, None
+            if dedup_rows and dedup_fields:
+                activity, dedup_removed = runner.run(
+                    "dedup", (tuple(dedup_fields), col_first, col_last, col_title, col_details),
+                    lambda: dedup_activity(runner.result("normalize"), dedup_fields, col_first, col_last, col_title,
+                                           col_details),
+                    upstream=["normalize"])
+                activity_stage = "dedup"
+            runner.run("join", (compact,), lambda: join_master(activity, runner.result("master_slim"), compact),
+                       upstream=[activity_stage, "master_slim"])
+            if fuzzy_match:
+                runner.run("fuzzy_index", (), lambda: build_fuzzy_index(runner.result("master_slim")),
+                           upstream=["master_slim"])
+                matched, fuzzy_hits = runner.run(
+                    "fuzzy", (fuzzy_threshold, compact),
+                    lambda: fuzzy_join(runner.result("join"), runner.result("master_slim"),
+                                       runner.result("fuzzy_index"), fuzzy_threshold, compact),
+                    upstream=["join", "fuzzy_index"])
+                matched_stage = "fuzzy"
+            else:
+                matched, matched_stage = runner.result("join"), "join"
+            if delta_mode:
+                # Replaces classify + template: only rows missing from the row store are processed.
+                # The batch (the activity files' content) keeps reruns of the same upload stable.
+                batch = batch_id(file_keys)
+                delta_frame, delta_new, delta_counts = runner.run(
+                    "delta", (delta_store_path, batch, col_last, master_ind_col, *email_inputs),
+                    lambda: delta_rows(matched, DeltaStore(delta_store_path), batch, col_first, col_last, col_title,
+                                       col_account, col_details, master_ind_col, hash_mode, compact,
+                                       int(email_workers), int(parallel_min_keys)),
+                    upstream=[matched_stage])
+                merged = runner.run("delta_output", (delta_output,),
+                                    lambda: delta_frame if delta_output == "full" else delta_frame[delta_new],
+                                    upstream=["delta"])
+                return merged, "delta_output", None, fuzzy_hits, dedup_removed, delta_counts
+            runner.run("classify", (col_details, master_ind_col, compact),
+                       lambda: classify_rows(matched, col_details, master_ind_col, compact), upstream=[matched_stage])
+            if lazy_emails:
+                # Subject Line / Email Body are rendered per output row set (see render())
+                return runner.result("classify"), "classify", None, fuzzy_hits, dedup_removed, delta_counts
+            merged, n_email_keys = runner.run(
+                "template", email_inputs,
+                lambda: template_rows(runner.result("classify"), col_first, col_title, col_account, col_details,
+                                      hash_mode, compact, int(email_workers), int(parallel_min_keys)),
+                upstream=["classify"])
+            return merged, "template", n_email_keys, fuzzy_hits, dedup_removed, delta_counts
+
+        if background:
+            # The merge runs on a worker thread into the job's own stage store. Once it is done the
+            # store is merged into this session's, so merge_stages() below only reads cached results.
+            jobs = _job_manager()
+            job_key = content_hash(repr((
+                runner.fingerprints["master_slim"], file_keys, activity_usecols, col_account, normalize_names,
+                compact, dedup_rows, tuple(dedup_fields), fuzzy_match, fuzzy_threshold, delta_mode,
+                delta_store_path, delta_output, lazy_emails, col_last, master_ind_col, email_inputs,
+            )).encode("utf-8"))
+            if st.session_state.get("pipeline_job_merged") != job_key:
+                # Seeded with this session's merge stages and those of the job it supersedes, so
+                # only stages whose inputs changed are recomputed
+                previous = jobs.get(st.session_state.get("pipeline_job", ""))
+                seed = {**store, **(previous.stages if previous is not None else {})}
+                if previous is not None and previous.key != job_key:
+                    # Only this session's own superseded job; other sessions' jobs keep running
+                    jobs.cancel(previous.key)
+                    previous.release()
+                job_runner = runner.fork({name: seed[name] for name in MERGE_STAGES if name in seed})
+                st.session_state["pipeline_job"] = job_key
+
+                def run_job(job: Job) -> None:
+                    job.stages = job_runner.store
+                    merge_stages(job_runner)
+
+                job = jobs.submit(job_key, run_job)
+                if job.status == DONE and job.released:
+                    # Its results were already collected (by another session) or dropped
+                    job = jobs.submit(job_key, run_job, restart=True)
+                if job.status != DONE:
+                    job_panel(jobs, job_key, run_job)
+                    st.stop()
+                # The job keeps only its status from here on
+                store.update(job.release())
+                st.session_state["pipeline_job_merged"] = job_key
+        merged, merged_stage, n_email_keys, fuzzy_hits, dedup_removed, delta_counts = merge_stages(runner)
+        # Split and filter work on row positions; only the output columns are ever copied
+        assigned_pos, unassigned_pos = runner.run(
+            "split", (master_rep_col, col_account),
+            lambda: split_positions(merged, master_rep_col, col_account), upstream=[merged_stage])
+        n_accounts = runner.run("summary", (), lambda: merged["__acct_key__"].nunique(), upstream=[merged_stage])
+        runner.run("filter", (rep_frags,), lambda: filter_positions(merged, assigned_pos, master_rep_col, rep_frags),
+                   upstream=["split"])
+        output_blanks = blank_cols + [master_rep_col]
+
+        def render(positions) -> pd.DataFrame:
+            if lazy_emails:
+                return template_output(merged, positions, out_cols, output_blanks, col_first, col_title, col_account,
+                                       col_details, hash_mode, compact, int(email_workers), int(parallel_min_keys))
+            return take_output(merged, positions, out_cols, output_blanks)
+
+        # The full output frames are only built when exports are prepared; declaring them here
+        # lets the export stages below check whether they are current
+        output_key = (tuple(out_cols), tuple(output_blanks), lazy_emails, email_inputs)
+        output_sources = {"output_rep": ("filter", lambda: runner.result("filter")),
+                          "output_unassigned": ("split", lambda: unassigned_pos)}
+        for name, (upstream, _) in output_sources.items():
+            runner.declare(name, output_key, [upstream])
+
+        def output(name: str) -> pd.DataFrame:
+            upstream, positions = output_sources[name]
+            return runner.run(name, output_key, lambda: render(positions()), upstream=[upstream])
+
+        memory = runner.run("memory", (),
+                            lambda: (frame_nbytes(merged), uncompacted_nbytes(merged) if compact else None),
+                            upstream=[merged_stage])
 
         # Metrics
-        st.success(f"Merged {len(merged):,} activity rows across {len(merged['__acct_key__'].unique()):,} unique accounts.")
-        c1, c2, c3 = st.columns(3)
+        st.success(f"Merged {len(merged):,} activity rows across {n_accounts:,} unique accounts.")
+        c1, c2, c3, c4 = st.columns(4)
         with c1:
             st.metric("Total Activity Rows", len(merged))
         with c2:
-            st.metric("Assigned Rows (pre-filter)", len(merged[merged["Assigned"]]))
+            st.metric("Assigned Rows (pre-filter)", len(assigned_pos))
         with c3:
-            st.metric("Unassigned Rows", len(without_rep))
-
-        st.subheader("Preview: Rep Accounts (filtered by rep fragments)")
-        st.dataframe(with_rep_out.head(25), use_container_width=True)
-
-        st.subheader("Preview: Unassigned Web Activity")
-        st.dataframe(without_rep_out.head(25), use_container_width=True)
-
-        # Downloads
-        st.download_button(
-            "⬇️ Download — Rep Accounts",
-            with_rep_out.to_csv(index=False).encode("utf-8"),
-            file_name="rep_accounts.csv",
-            mime="text/csv",
-        )
-        st.download_button(
-            "⬇️ Download — Unassigned Web Activity",
-            without_rep_out.to_csv(index=False).encode("utf-8"),
-            file_name="unassigned_web_activity.csv",
-            mime="text/csv",
+            st.metric("Unassigned Rows", len(unassigned_pos))
+        with c4:
+            if n_email_keys is None:
+                st.metric("Email Dedup Ratio", "—",
+                          help="Previously processed rows reuse their stored emails." if delta_mode
+                          else "Emails are generated only for previewed and exported rows.")
+            else:
+                dedup_ratio = len(merged) / n_email_keys if n_email_keys else 0.0
+                st.metric("Email Dedup Ratio", f"{dedup_ratio:.1f}x",
+                          help=f"{len(merged):,} rows templated from {n_email_keys:,} distinct keys.")
+        merged_bytes, object_bytes = memory
+        if object_bytes is not None:
+            st.caption(f"Working frame memory: {merged_bytes / 2**20:,.1f} MB compact vs "
+                       f"{object_bytes / 2**20:,.1f} MB as object columns "
+                       f"({1 - merged_bytes / max(object_bytes, 1):.0%} saved).")
+        else:
+            st.caption(f"Working frame memory: {merged_bytes / 2**20:,.1f} MB (enable compact-memory mode to reduce it).")
+        if master_index is not None:
+            diff = st.session_state.get("master_index_diff")
+            if diff is not None:
+                st.info(f"Master index {master_index_path} updated — {diff.summary()}.")
+                if len(diff.changes):
+                    with st.expander(f"Master changes ({len(diff.changes):,} accounts)"):
+                        st.dataframe(diff.changes.head(1000), use_container_width=True)
+            elif f_master is None:
+                st.info(f"Using master index {master_index_path} "
+                        f"({int(index_meta['rows']):,} accounts, updated {index_meta['updated_at']}).")
+        if dedup_removed is not None:
+            st.caption(f"De-duplication removed {sum(dedup_removed.values()):,} rows ("
+                       + ", ".join(f"{source} {dedup_removed[source]:,}" for source in DEDUP_PRECEDENCE) + ").")
+        if delta_mode:
+            st.info(f"Row store {delta_store_path} — {delta_counts.summary()}."
+                    + (" Outputs contain only the new rows." if delta_output == "delta" else ""))
+        if fuzzy_match:
+            st.caption(f"Fuzzy matching recovered {fuzzy_hits:,} rows that had no exact master match "
+                       f"(threshold {fuzzy_threshold:.2f}).")
+        st.caption("Recomputed stages: " + (", ".join(runner.recomputed) or "none (all cached)"))
+        finished_job = jobs.get(job_key) if background else None
+        if finished_job is not None:
+            st.caption(f"Merge ran as a background job ({finished_job.elapsed_seconds():.1f}s).")
+        with st.expander("File parsing"):
+            # Cached files show the time of the parse that filled the cache
+            st.dataframe(parse_report.rename(columns={"seconds": "parse seconds"}), use_container_width=True,
+                         hide_index=True)
+            fallback = parse_report["parser"].eq("openpyxl").any() and excel_engine_choice == "calamine"
+            if fallback:
+                st.caption("calamine was unavailable (or could not read a workbook); openpyxl was used instead.")
+
+        def preview(title: str, positions, key: str) -> None:
+            # Only the visible page is rendered
+            st.subheader(title)
+            pages = max(1, -(-len(positions) // PREVIEW_ROWS))
+            page = 1
+            if pages > 1:
+                page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, value=1, step=1, key=key)
+            start = (int(page) - 1) * PREVIEW_ROWS
+            st.dataframe(render(positions[start:start + PREVIEW_ROWS]), use_container_width=True)
+
+        preview("Preview: Rep Accounts (filtered by rep fragments)", runner.result("filter"), "preview_rep_page")
+        preview("Preview: Unassigned Web Activity", unassigned_pos, "preview_unassigned_page")
+
+        # Downloads: exports are built on request, streamed chunk by chunk, and cached per
+        # pipeline result and format
+        st.subheader("Downloads")
+        export_format = st.selectbox(
+            "Export format",
+            [*EXPORT_FORMATS, "zip"],
+            format_func=lambda f: {"csv": "CSV", "csv.gz": "CSV (gzip)", "parquet": "Parquet", "xlsx": "Excel (XLSX)",
+                                   "zip": "ZIP bundle (both outputs as CSV)"}[f],
         )
+        export_stage = f"export_{export_format}"
+        export_upstream = ["output_rep", "output_unassigned"]
+        partition_format = "csv" if export_format == "zip" else export_format
+        if partition_by != "none":
+            # One pass over the filtered assigned rows; files are only written on request below
+            partitions = runner.run("partition", (partition_by,),
+                                    lambda: partition_positions(merged, runner.result("filter"), master_rep_col,
+                                                                partition_by, parse_rep_frags(rep_frags)),
+                                    upstream=["filter"])
+            st.caption(f"Per-rep export: {len(partitions):,} files "
+                       f"({'reps' if partition_by == 'rep' else 'fragments'} with matching rows: "
+                       f"{sum(1 for _, pos in partitions if len(pos)):,}).")
+            if partition_by == "fragment" and not partitions:
+                st.warning("Enter rep fragments to export one file per fragment.")
+
+        def build_partitions() -> bytes:
+            stems = partition_stems([label for label, _ in partitions])
+            manifest = partition_manifest(merged, partitions, [export_name(stem, partition_format) for stem in stems])
+            return bundle_bytes(
+                ((stem, render(pos)) for stem, (_, pos) in zip(stems, partitions)),
+                partition_format, extra={"manifest.csv": manifest.to_csv(index=False).encode("utf-8")})
+
+        prepared = runner.is_current(export_stage, (), export_upstream) and (
+            partition_by == "none" or runner.is_current(f"partitions_{partition_format}", (), ["partition", "output_rep"]))
+        if prepared or st.button("Prepare downloads"):
+            try:
+                with st.spinner("Writing exports…"):
+                    with_rep_out, without_rep_out = output("output_rep"), output("output_unassigned")
+                    if export_format == "zip":
+                        exports = runner.run(
+                            export_stage, (),
+                            lambda: bundle_bytes([("rep_accounts", with_rep_out), ("unassigned_web_activity", without_rep_out)]),
+                            upstream=export_upstream)
+                    else:
+                        exports = runner.run(
+                            export_stage, (),
+                            lambda: (export_bytes(with_rep_out, export_format),
+                                     export_bytes(without_rep_out, export_format)),
+                            upstream=export_upstream)
+                    if partition_by != "none":
+                        partition_zip = runner.run(f"partitions_{partition_format}", (), build_partitions,
+                                                   upstream=["partition", "output_rep"])
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                if export_format == "zip":
+                    st.download_button("⬇️ Download — Both outputs (ZIP)", exports,
+                                       file_name="unify_engagement_exports.zip", mime=ZIP_MIME)
+                else:
+                    mime = EXPORT_FORMATS[export_format][1]
+                    st.download_button("⬇️ Download — Rep Accounts", exports[0],
+                                       file_name=export_name("rep_accounts", export_format), mime=mime)
+                    st.download_button("⬇️ Download — Unassigned Web Activity", exports[1],
+                                       file_name=export_name("unassigned_web_activity", export_format), mime=mime)
+                if partition_by != "none":
+                    st.download_button(f"⬇️ Download — Rep Accounts per {partition_by} (ZIP)", partition_zip,
+                                       file_name=f"rep_accounts_by_{partition_by}.zip", mime=ZIP_MIME)
+        else:
+            st.caption("Exports are generated on request, so large results are not serialized on every rerun.")
+
+        if trace is not None:
+            trace.log()
+            with st.expander(f"Diagnostics — {trace.total_seconds:.2f}s across {len(trace.records)} steps", expanded=True):
+                st.dataframe(trace.to_frame(), use_container_width=True, hide_index=True)
+                st.download_button("⬇️ Download diagnostics (JSON)", trace.to_json(),
+                                   file_name="pipeline_diagnostics.json", mime="application/json")
 else:
-    st.info("Upload all four files (Known, Unknown, Intent, and Master Account List) to begin.")
\ No newline at end of file
+    if index_ready:
+        st.info("Upload the three activity files to begin (the saved master index will be used unless a new Master Account List is uploaded).")
+    else:
+        st.info("Upload all four files (Known, Unknown, Intent, and Master Account List) to begin.")
\ No newline at end of file
@@ -0,0 +1,151 @@
+# bench/generate.py — Synthetic Known / Unknown / Intent / Master files for benchmarking
+# ---------------------------------------------------------------------
+# Usage: python -m bench.generate --rows 100000 --out-dir bench/data/100k
+# Column names follow the sidebar defaults (pipeline.Settings). Activity account names carry
+# realistic noise (case, spacing, legal-suffix variants, punctuation, typos, accounts missing
+# from the master); Details URLs hit the product_from_details triggers; titles span the roles.
+
+import argparse
+import os
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from pipeline import Settings
+
+SOURCE_SHARE = {"known": 0.40, "unknown": 0.35, "intent": 0.25}
+STEMS = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Vandelay", "Stark", "Wayne", "Tyrell", "Cyberdyne",
+         "Soylent", "Wonka", "Gringotts", "Oscorp", "Massive Dynamic", "Aperture", "Black Mesa", "Nakatomi",
+         "Monarch", "Virtucon", "Dunder", "Sterling", "Pied Piper", "Zorg", "Prestige", "Blue Sun"]
+QUALIFIERS = ["", "Industries", "Energy", "Aerospace", "Foods", "Chemicals", "Mining", "Motors", "Pharma",
+              "Utilities", "Systems", "Manufacturing", "Semiconductor", "Holdings", "Power", "Refining"]
+SUFFIXES = ["Corp", "Corporation", "Inc", "Inc.", "LLC", "Ltd", "Co.", "Company", "GmbH", "PLC", ""]
+INDUSTRIES = ["Oil & Gas", "Aerospace & Defense", "Automotive", "Life Sciences", "Food & Beverage", "Chemicals",
+              "Utilities", "Mining & Metals", "Electronics", "Industrial Machinery", "Discrete Manufacturing",
+              "Retail", "", None]
+DETAILS = [
+    "https://hexagon.com/products/hxgn-eam", "https://hexagon.com/solutions/enterprise-asset-management",
+    "https://hexagon.com/solutions/preventative-maintenance", "https://hexagon.com/products/asset-performance",
+    "https://hexagon.com/products/apm-overview", "https://hexagon.com/products/etq-reliance-qms",
+    "https://hexagon.com/solutions/quality-compliance", "https://hexagon.com/solutions/project-management/ecosys",
+    "https://hexagon.com/products/project-controls", "https://hexagon.com/products/coordinate-measuring-machines",
+    "https://hexagon.com/products/cadworx-plant", "https://hexagon.com/products/caesar-ii",
+    "https://hexagon.com/solutions/productivity-and-efficiency", "https://hexagon.com/products/acceleratorkms",
+    "https://hexagon.com/company/careers", "https://hexagon.com/", "https://hexagon.com/company/newsroom",
+    "Webinar: Digital Transformation in Operations", "",
+]
+TITLES = ["Chief Operating Officer", "CIO", "SVP Operations", "Vice President, Engineering", "VP Maintenance",
+          "Director of Quality", "Quality Engineer", "Compliance Manager", "Maintenance Planner",
+          "Reliability Engineer", "Asset Manager", "Project Controls Lead", "Program Manager", "Plant Manager",
+          "Manufacturing Engineer", "Design Engineer", "Piping Designer", "EHS Coordinator", "Safety Manager",
+          "IT Manager", "Data Analyst", "Information Technology Specialist", "Team Lead", "Buyer", "", None]
+FIRST = ["ann", "bob", "carla", "dev", "erin", "femi", "gus", "hana", "ivan", "jo", "kim", "luis", "mei", ""]
+LAST = ["Smith", "Jones", "Garcia", "Nguyen", "Patel", "Müller", "O'Brien", "Kim", "Rossi", "Silva"]
+REPS = [f"{f} {l}" for f, l in zip(
+    ["Alex", "Blair", "Casey", "Drew", "Emery", "Finley", "Gray", "Harper", "Indy", "Jules"] * 4,
+    ["Adams", "Brooks", "Chen", "Diaz", "Evans", "Foster", "Grant", "Hayes", "Ito", "Jensen",
+     "Khan", "Lopez", "Meyer", "Novak", "Ortiz", "Price", "Quinn", "Reyes", "Shah", "Turner",
+     "Upton", "Vance", "Walsh", "Xu", "Young", "Zhang", "Abbott", "Bishop", "Cole", "Dunn",
+     "Ellis", "Fox", "Gill", "Hart", "Irwin", "Jacobs", "Keane", "Lam", "Mills", "Nash"])]
+
+def _account_names(rng: np.random.Generator, n: int) -> np.ndarray:
+    names = set()
+    while len(names) < n:
+        k = n - len(names)
+        stem = rng.choice(STEMS, k)
+        qual = rng.choice(QUALIFIERS, k)
+        num = rng.integers(1, max(2, n // 20), k)
+        suffix = rng.choice(SUFFIXES, k)
+        for s, q, i, x in zip(stem, qual, num, suffix):
+            names.add(" ".join(p for p in [s, q, str(i), x] if p))
+    return np.array(sorted(names), dtype=object)
+
+def _noisy(rng: np.random.Generator, names: np.ndarray) -> np.ndarray:
+    # ~70% verbatim; the rest get case / spacing / suffix / punctuation / typo noise
+    out = names.copy()
+    roll = rng.random(len(names))
+    for i in np.flatnonzero(roll >= 0.70):
+        s, r = out[i], roll[i]
+        if r < 0.78:
+            s = s.upper() if r < 0.74 else s.lower()
+        elif r < 0.85:
+            s = "  " + s.replace(" ", "  ") + " "
+        elif r < 0.91:
+            for a, b in [("Corporation", "Corp."), ("Corp", "Corporation"), ("Inc.", "Inc"), ("Inc", "Incorporated"),
+                         ("Company", "Co"), ("LLC", "L.L.C.")]:
+                if s.endswith(a):
+                    s = s[: -len(a)] + b
+                    break
+            else:
+                s = s + " Inc."
+        elif r < 0.95:
+            s = s.replace(" ", ", ", 1)
+        elif len(s) > 4:
+            j = int(rng.integers(1, len(s) - 1))
+            s = s[:j] + s[j + 1] + s[j] + s[j + 2:]
+        out[i] = s
+    return out
+
+def generate(rows: int, out_dir: str, seed: int = 0, n_accounts: Optional[int] = None,
+             master_format: str = "xlsx", settings: Optional[Settings] = None) -> Dict[str, str]:
+    s = settings or Settings()
+    rng = np.random.default_rng(seed)
+    n_accounts = n_accounts or int(min(80_000, max(500, rows // 12)))
+    accounts = _account_names(rng, n_accounts)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+
+    # Master: ~85% of accounts, 40 reps with some unassigned
+    in_master = rng.random(n_accounts) < 0.85
+    reps = rng.choice(np.array(REPS + [""] * 6, dtype=object), n_accounts)
+    master = pd.DataFrame({
+        s.master_account_col: accounts[in_master],
+        s.master_rep_col: reps[in_master],
+        s.master_ind_col: rng.choice(np.array(INDUSTRIES, dtype=object), int(in_master.sum())),
+        "Account Owner Region": rng.choice(["NA", "EMEA", "APAC", "LATAM"], int(in_master.sum())),
+    })
+    paths["master"] = os.path.join(out_dir, f"master.{master_format}")
+    if master_format == "csv":
+        master.to_csv(paths["master"], index=False)
+    else:
+        master.to_excel(paths["master"], index=False)
+
+    # Activity: Zipf-ish account popularity so a few accounts carry most page views
+    weights = 1.0 / np.arange(1, n_accounts + 1) ** 0.8
+    weights /= weights.sum()
+    popularity = rng.permutation(n_accounts)
+    for source, share in SOURCE_SHARE.items():
+        n = int(rows * share)
+        acct = accounts[popularity[rng.choice(n_accounts, n, p=weights)]]
+        df = pd.DataFrame({
+            s.col_account: _noisy(rng, acct),
+            s.col_details: rng.choice(np.array(DETAILS, dtype=object), n),
+            "Visit Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 30 * 24 * 60, n), unit="min"),
+            "Page Views": rng.integers(1, 20, n),
+        })
+        if source == "known":
+            df.insert(0, s.col_first, rng.choice(np.array(FIRST, dtype=object), n))
+            df.insert(1, s.col_last, rng.choice(np.array(LAST, dtype=object), n))
+            df.insert(2, s.col_title, rng.choice(np.array(TITLES, dtype=object), n))
+        elif source == "intent":
+            df["Intent Topic"] = rng.choice(["Asset Management", "Quality Management", "Project Controls"], n)
+            df["Intent Score"] = rng.integers(50, 100, n)
+        paths[source] = os.path.join(out_dir, f"{source}.csv")
+        df.to_csv(paths[source], index=False)
+    return paths
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Generate synthetic Known/Unknown/Intent/Master files.")
+    p.add_argument("--rows", type=int, default=100_000, help="Total activity rows across the three files.")
+    p.add_argument("--accounts", type=int, default=None, help="Distinct accounts (default: rows/12, 500..80k).")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--master-format", choices=["xlsx", "csv"], default="xlsx")
+    p.add_argument("--out-dir", required=True)
+    args = p.parse_args()
+    paths = generate(args.rows, args.out_dir, args.seed, args.accounts, args.master_format)
+    for name, path in paths.items():
+        print(f"{name:8s} {path}")
+
+if __name__ == "__main__":
+    main()
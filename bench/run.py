@@ -0,0 +1,127 @@
+# bench/run.py — Stage timings for the merge pipeline at several input sizes
+# ---------------------------------------------------------------------
+# Usage: python -m bench.run [--sizes 10000 100000 1000000] [--output bench/results/latest.json]
+# Generates (or reuses) synthetic inputs under --data-dir, runs each pipeline stage in order
+# and records wall time per stage. Results are written as JSON so runs from different
+# versions can be compared.
+
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+import emails
+from bench.generate import generate
+from pipeline import (
+    EXCEL_ENGINES, READ_MODES, Settings, build_fuzzy_index, build_master_slim, classify_rows, combine_activity,
+    filter_reps, fuzzy_join, join_master, read_tables, select_output, split_assigned, template_rows, to_csv_bytes,
+)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+BENCH_REP_FRAGS = "chen,lopez"
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def bench_size(paths: Dict[str, str], settings: Settings, fuzzy: bool = False,
+               read_mode: str = "sequential") -> Dict[str, float]:
+    s = settings
+    timings: Dict[str, float] = {}
+
+    def timed(name, fn):
+        gc.collect()
+        t0 = time.perf_counter()
+        result = fn()
+        timings[name] = round(time.perf_counter() - t0, 4)
+        return result
+
+    # Cold run: no templating carried over from the previous size
+    emails._subject_cached.cache_clear()
+    emails._body_cached.cache_clear()
+
+    parsed = timed("read", lambda: read_tables([(p, os.path.basename(p), None) for p in paths.values()],
+                                               engine=s.excel_engine, mode=read_mode))
+    frames = {k: df for k, (df, _, _) in zip(paths, parsed)}
+    activity = timed("normalize", lambda: combine_activity(frames["known"], frames["unknown"], frames["intent"],
+                                                           s.col_account, s.normalize_names))
+    master = frames["master"]
+    merge_cols = [s.master_rep_col] + ([s.master_ind_col] if s.master_ind_col in master.columns else [])
+    master_slim = timed("master_lookup", lambda: build_master_slim(master, s.master_account_col, merge_cols,
+                                                                   s.normalize_names))
+    merged = timed("merge", lambda: join_master(activity, master_slim))
+    if fuzzy:
+        index = timed("fuzzy_index", lambda: build_fuzzy_index(master_slim))
+        merged, _ = timed("fuzzy_join", lambda: fuzzy_join(merged, master_slim, index, s.fuzzy_threshold))
+    classified = timed("classify", lambda: classify_rows(merged, s.col_details, s.master_ind_col))
+    templated, n_keys = timed("template", lambda: template_rows(classified, s.col_first, s.col_title,
+                                                                s.col_account, s.col_details, s.hash_mode,
+                                                                workers=s.workers,
+                                                                parallel_min_keys=s.parallel_min_keys))
+    with_rep, without_rep = timed("split", lambda: split_assigned(templated, s.master_rep_col, s.col_account))
+    filtered = timed("filter", lambda: filter_reps(with_rep, s.master_rep_col, BENCH_REP_FRAGS))
+    cols = s.out_cols()
+    timed("csv_export", lambda: [to_csv_bytes(select_output(f, cols, s.blank_cols()))
+                                 for f in (filtered, without_rep)])
+    timings["total"] = round(sum(timings.values()), 4)
+    timings["template_keys"] = n_keys
+    return timings
+
+def main(argv: Optional[List[str]] = None) -> None:
+    p = argparse.ArgumentParser(description="Benchmark the merge pipeline stage by stage.")
+    p.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Activity row counts to benchmark.")
+    p.add_argument("--data-dir", default=os.path.join("bench", "data"),
+                   help="Where synthetic inputs are generated / reused.")
+    p.add_argument("--master-format", choices=["xlsx", "csv"], default="xlsx")
+    p.add_argument("--hash-mode", choices=emails.HASH_MODES, default="sha256")
+    p.add_argument("--fuzzy", action="store_true", help="Include the fuzzy-join stage.")
+    p.add_argument("--read-mode", choices=READ_MODES, default="sequential", help="How the four input files are parsed.")
+    p.add_argument("--excel-engine", choices=EXCEL_ENGINES, default="openpyxl")
+    p.add_argument("--workers", type=int, default=1, help="Processes for email rendering (1 = serial).")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--output", default=None,
+                   help="JSON results file (default: bench/results/<timestamp>-<revision>.json).")
+    args = p.parse_args(argv)
+
+    settings = Settings(hash_mode=args.hash_mode, fuzzy=args.fuzzy, excel_engine=args.excel_engine,
+                        workers=args.workers)
+    revision = _git_revision()
+    report = {
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "settings": {"hash_mode": args.hash_mode, "fuzzy": args.fuzzy, "master_format": args.master_format,
+                     "read_mode": args.read_mode, "excel_engine": args.excel_engine, "workers": args.workers},
+        "results": [],
+    }
+    for rows in args.sizes:
+        data_dir = os.path.join(args.data_dir, f"{rows}-seed{args.seed}")
+        paths = {k: os.path.join(data_dir, f"{k}.csv") for k in ["known", "unknown", "intent"]}
+        paths["master"] = os.path.join(data_dir, f"master.{args.master_format}")
+        if not all(os.path.exists(p) for p in paths.values()):
+            print(f"generating {rows:,} rows -> {data_dir}")
+            paths = generate(rows, data_dir, seed=args.seed, master_format=args.master_format)
+        timings = bench_size(paths, settings, fuzzy=args.fuzzy, read_mode=args.read_mode)
+        report["results"].append({"rows": rows, "stages": timings})
+        print(f"{rows:>10,} rows  " + "  ".join(f"{k}={v}" for k, v in timings.items()))
+
+    output = args.output or os.path.join("bench", "results", f"{time.strftime('%Y%m%d-%H%M%S')}-{revision}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"results -> {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# classify.py — Declarative keyword rules for Product / Industry / Role classification
+# ---------------------------------------------------------------------
+# Each rule table is an ordered list of (label, keywords); the first rule with any keyword
+# contained in the lower-cased text wins. Tables are compiled once into a RuleMatcher that
+# classifies a single value or a whole pandas column (one regex pass per rule, over the
+# distinct values only).
+
+import re
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+Rule = Tuple[str, Sequence[str]]
+
+# -----------------------------
+# Text helpers
+# -----------------------------
+def safe_str(x) -> str:
+    try:
+        return "" if pd.isna(x) else str(x).strip()
+    except Exception:
+        return "" if x is None else str(x).strip()
+
+def clean_text(values: pd.Series) -> pd.Series:
+    # Column equivalent of safe_str: NaN/None -> "", everything else str() and stripped
+    s = values.astype(object)
+    return s.where(s.notna(), "").astype(str).str.strip()
+
+# -----------------------------
+# Rule tables (priority order)
+# -----------------------------
+PRODUCT_RULES: List[Rule] = [
+    ("HxGN EAM/APM", ["eam", "asset management", "hxgn eam", "hxgn-eam", "enterprise-asset-management",
+                      "maintenance", "equipment management", "preventative maintenance", "asset data"]),
+    ("HxGN APM", ["asset performance", "apm"]),
+    ("ETQ", ["quality", "etq", "qms", "compliance"]),
+    ("Ecosys", ["project-management", "controls", "ecosys"]),
+    ("Scanner", ["measuring-machines"]),
+    ("CADWorx", ["cadworx"]),
+    ("CAESAR II", ["caesar"]),
+    ("J5/AKMS", ["productivity-and-efficiency", "digital transformation"]),
+    ("AKMS", ["acceleratorkms"]),
+]
+
+INDUSTRY_RULES: List[Rule] = [
+    ("aerospace", ["aerospace", "defense"]),
+    ("automotive", ["automotive", "vehicle", "mobility"]),
+    ("energy", ["oil", "gas", "o&g", "energy", "upstream", "midstream", "downstream", "refining"]),
+    ("lifesciences", ["life science", "pharma", "biotech", "medical"]),
+    ("foodbev", ["food", "beverage", "f&b"]),
+    ("chemicals", ["chem", "petrochem"]),
+    ("utilities", ["utilities", "power", "generation", "transmission", "distribution"]),
+    ("mining", ["mining", "metals"]),
+    ("hitech", ["electronics", "semiconductor", "high-tech", "hi tech", "hitech"]),
+    ("discrete", ["discrete", "machinery", "heavy", "industrial"]),
+]
+
+ROLE_RULES: List[Rule] = [
+    ("exec", ["chief ", "cxo", "ceo", "cfo", "coo", "cio", "cto", "ciso", "president"]),
+    ("exec", ["svp", "evp"]),
+    ("vp", ["vice president", "vp"]),
+    ("director", ["director"]),
+    ("quality", ["quality", "compliance", "qms", "regulatory"]),
+    ("maintenance", ["maintenance", "reliability", "asset", "condition monitoring"]),
+    ("projects", ["project controls", "project manager", "program manager", "pmo"]),
+    ("operations", ["operations", "manufacturing", "plant manager", "production"]),
+    ("engineering", ["engineering", "design", "cad", "piping"]),
+    ("safety", ["ehs", "hse", "safety"]),
+    ("it", ["it ", "ot ", "information technology", "industrial it", "systems", "data"]),
+    ("manager", ["manager", "lead", "head"]),
+]
+
+# -----------------------------
+# Compiled matcher
+# -----------------------------
+class RuleMatcher:
+    def __init__(self, rules: Sequence[Rule], default: str, empty: Optional[str] = None):
+        self.default = default
+        self.empty = default if empty is None else empty
+        self._compiled = [
+            (label, re.compile("|".join(re.escape(k) for k in keywords)))
+            for label, keywords in rules
+        ]
+
+    def match(self, text) -> str:
+        s = safe_str(text).lower()
+        if not s:
+            return self.empty
+        for label, pattern in self._compiled:
+            if pattern.search(s):
+                return label
+        return self.default
+
+    def match_series(self, values: pd.Series) -> pd.Series:
+        text = clean_text(values).str.lower()
+        codes, uniques = pd.factorize(text)
+        uniques = pd.Series(uniques, dtype=object)
+
+        labels = np.full(len(uniques), self.default, dtype=object)
+        pending = (uniques != "").to_numpy()
+        labels[~pending] = self.empty
+        for label, pattern in self._compiled:
+            if not pending.any():
+                break
+            idx = np.flatnonzero(pending)
+            hits = uniques.iloc[idx].str.contains(pattern, regex=True).to_numpy(dtype=bool)
+            labels[idx[hits]] = label
+            pending[idx[hits]] = False
+
+        return pd.Series(labels[codes], index=values.index, dtype=object)
+
+def compile_rules(rules: Sequence[Rule], default: str, empty: Optional[str] = None) -> RuleMatcher:
+    return RuleMatcher(rules, default, empty)
+
+PRODUCT_MATCHER = compile_rules(PRODUCT_RULES, "N/A")
+INDUSTRY_MATCHER = compile_rules(INDUSTRY_RULES, "other", empty="discrete")
+ROLE_MATCHER = compile_rules(ROLE_RULES, "ic")
+
+def product_from_details(details: str) -> str:
+    return PRODUCT_MATCHER.match(details)
+
+def norm_industry(text: str) -> str:
+    return INDUSTRY_MATCHER.match(text)
+
+def role_category(title: str) -> str:
+    return ROLE_MATCHER.match(title)
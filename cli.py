@@ -0,0 +1,152 @@
+# cli.py — Headless batch entry point for the Web Activity + Master merge
+# ---------------------------------------------------------------------
+# Usage:
+#   python cli.py --known known.csv --unknown unknown.csv --intent intent.csv \
+#       --master master.xlsx --out-dir out/ [--rep-frags "smith,jones"] [--chunksize 100000]
+#       [--master-index master_index.sqlite] [--partition rep]
+#       [--delta-store activity_store.sqlite [--delta-output delta]]
+# Writes rep_accounts.csv and unassigned_web_activity.csv into --out-dir. CSV activity is
+# streamed in chunks, so memory is bounded by the chunk size plus the master lookup.
+
+import argparse
+import sys
+from typing import List, Optional
+
+import pandas as pd
+
+from cache import content_hash
+from delta_store import DeltaStore
+from emails import HASH_MODES
+from master_index import MasterIndex
+from pipeline import (
+    DEDUP_FIELDS, DEDUP_PRECEDENCE, DELTA_OUTPUTS, EXCEL_ENGINES, PARTITION_DIR, PARTITION_MODES, REP_OUTPUT, UNASSIGNED_OUTPUT, Settings,
+    load_master_slim, run_batch,
+)
+
+def build_parser() -> argparse.ArgumentParser:
+    d = Settings()
+    p = argparse.ArgumentParser(description="Merge Known/Unknown/Intent web activity with the Master Account List.")
+    files = p.add_argument_group("input files")
+    files.add_argument("--known", required=True, help="Known Activity (CSV/XLSX)")
+    files.add_argument("--unknown", required=True, help="Unknown Activity (CSV/XLSX)")
+    files.add_argument("--intent", required=True, help="Intent (CSV/XLSX)")
+    files.add_argument("--master", help="Master Account List (XLSX/CSV); optional when --master-index already exists")
+    files.add_argument("--master-index", metavar="PATH",
+                       help="Persistent SQLite master index: refreshed from --master when given, otherwise loaded instead of it")
+
+    cols = p.add_argument_group("web-activity column mapping")
+    cols.add_argument("--col-account", default=d.col_account)
+    cols.add_argument("--col-details", default=d.col_details)
+    cols.add_argument("--col-first", default=d.col_first)
+    cols.add_argument("--col-last", default=d.col_last)
+    cols.add_argument("--col-title", default=d.col_title)
+
+    master = p.add_argument_group("master account list settings")
+    master.add_argument("--master-account-col", default=d.master_account_col)
+    master.add_argument("--master-rep-col", default=d.master_rep_col)
+    master.add_argument("--master-ind-col", default=d.master_ind_col)
+
+    p.add_argument("--rep-frags", default=d.rep_frags,
+                   help="Comma-separated rep fragments filtering the Rep Accounts output (case-insensitive).")
+    p.add_argument("--partition", choices=PARTITION_MODES, default="none",
+                   help=f"Also write the Rep Accounts rows as one CSV per rep (or per --rep-frags fragment) "
+                        f"under {PARTITION_DIR}/, with a manifest of row and account counts.")
+    p.add_argument("--delta-store", metavar="PATH",
+                   help="Local row store from earlier runs: only activity rows missing from it are classified and "
+                        "templated, and the new rows are added to it.")
+    p.add_argument("--delta-output", choices=DELTA_OUTPUTS, default="full",
+                   help="With --delta-store: write all rows (full) or only rows new to the store (delta).")
+    p.add_argument("--no-normalize", dest="normalize_names", action="store_false",
+                   help="Match account names exactly instead of trim/collapse spaces/casefold.")
+    p.add_argument("--dedup", action="store_true",
+                   help="Drop duplicate activity rows, keeping the copy from the first source in "
+                        f"{' > '.join(DEDUP_PRECEDENCE)} order.")
+    p.add_argument("--dedup-key", nargs="+", choices=DEDUP_FIELDS, default=list(d.dedup_fields),
+                   help="Fields compared for --dedup (default: all). Drop contact to collapse the same visit "
+                        "across Known and Intent/Unknown.")
+    p.add_argument("--fuzzy", action="store_true",
+                   help="Fuzzy-match accounts missing from the master; adds Match Score / Matched Master Account columns.")
+    p.add_argument("--fuzzy-threshold", type=float, default=d.fuzzy_threshold,
+                   help=f"Minimum name similarity (0-1) for a fuzzy match (default: {d.fuzzy_threshold}).")
+    p.add_argument("--hash-mode", choices=HASH_MODES, default=d.hash_mode,
+                   help="Template variant picker: sha256 reproduces previously sent emails; fast is a cheaper stable hash.")
+    p.add_argument("--excel-engine", choices=EXCEL_ENGINES, default=d.excel_engine,
+                   help="XLSX parser; calamine needs python-calamine and falls back to openpyxl when unavailable.")
+    p.add_argument("--workers", type=int, default=d.workers,
+                   help="Processes for rendering subject lines / email bodies (default: 1, serial).")
+    p.add_argument("--parallel-min-keys", type=int, default=d.parallel_min_keys,
+                   help=f"Render in parallel only above this many distinct email keys (default: {d.parallel_min_keys}).")
+    p.add_argument("--compact", action="store_true",
+                   help="Parse only the mapped columns of each input file (lower peak memory on wide exports).")
+    p.add_argument("--chunksize", type=int, default=100_000, help="Activity rows per chunk (default: 100000).")
+    p.add_argument("--out-dir", default=".", help="Directory for the output CSVs (default: current directory).")
+    return p
+
+def resolve_master(master: Optional[str], index_path: Optional[str], settings: Settings) -> Optional[pd.DataFrame]:
+    # None means "let run_batch read --master itself"
+    if index_path is None:
+        if master is None:
+            raise ValueError("either --master or --master-index is required")
+        return None
+    index = MasterIndex(index_path)
+    if master is not None:
+        master_slim = load_master_slim(master, settings)
+        ind_col = settings.master_ind_col if settings.master_ind_col in master_slim.columns else None
+        with open(master, "rb") as fh:
+            source_hash = content_hash(fh.read())
+        diff = index.refresh(master_slim, settings.master_rep_col, ind_col, settings.normalize_names, source_hash)
+        print(f"Master index {index_path}: {diff.summary()}")
+        return master_slim
+    if not index.exists():
+        raise ValueError(f"master index {index_path} does not exist; pass --master to build it")
+    meta = index.meta()
+    if not index.matches(settings.master_rep_col, meta.get("ind_col"), settings.normalize_names):
+        raise ValueError(f"master index {index_path} was built for different master settings; pass --master to rebuild it")
+    return index.load()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    settings = Settings(
+        col_account=args.col_account,
+        col_details=args.col_details,
+        col_first=args.col_first,
+        col_last=args.col_last,
+        col_title=args.col_title,
+        master_account_col=args.master_account_col,
+        master_rep_col=args.master_rep_col,
+        master_ind_col=args.master_ind_col,
+        rep_frags=args.rep_frags,
+        normalize_names=args.normalize_names,
+        hash_mode=args.hash_mode,
+        fuzzy=args.fuzzy,
+        fuzzy_threshold=args.fuzzy_threshold,
+        compact=args.compact,
+        excel_engine=args.excel_engine,
+        workers=args.workers,
+        parallel_min_keys=args.parallel_min_keys,
+        dedup=args.dedup,
+        dedup_fields=tuple(args.dedup_key),
+    )
+    try:
+        master_slim = resolve_master(args.master, args.master_index, settings)
+        counts = run_batch(args.known, args.unknown, args.intent, args.master, args.out_dir,
+                           settings=settings, chunksize=args.chunksize, master_slim=master_slim,
+                           partition_by=args.partition,
+                           delta_store=DeltaStore(args.delta_store) if args.delta_store else None,
+                           delta_output=args.delta_output)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    print(f"Merged {counts['rows']:,} activity rows: "
+          f"{counts[REP_OUTPUT]:,} rep account rows, "
+          f"{counts[UNASSIGNED_OUTPUT]:,} unassigned rows -> {args.out_dir}")
+    if args.dedup:
+        removed = {source: counts.get(f"duplicates {source}", 0) for source in DEDUP_PRECEDENCE}
+        print(f"Removed {sum(removed.values()):,} duplicate rows ("
+              + ", ".join(f"{source} {n:,}" for source, n in removed.items()) + ")")
+    if PARTITION_DIR in counts:
+        print(f"Wrote {counts[PARTITION_DIR]:,} per-{args.partition} files -> {PARTITION_DIR}/")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# delta_store.py — Local store of processed activity rows for incremental (delta) runs
+# ---------------------------------------------------------------------
+# Recurring exports cover a rolling window, so most rows were already processed by an earlier
+# run. Each row is fingerprinted on (source, account, contact, details) and the store keeps its
+# derived columns plus the master industry they were computed from; later runs classify and
+# template only rows that are missing (or whose industry changed). Rows first stored by a batch
+# (one set of uploaded files) still count as new when that batch is run again, so reruns give
+# the same delta. Rows not seen for RETENTION_DAYS are pruned.
+
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+from cache import content_hash
+from master_index import as_db_text
+
+DEFAULT_STORE_PATH = "activity_store.sqlite"
+SCHEMA_VERSION = "1"
+RETENTION_DAYS = 90
+# Derived columns kept per fingerprint (everything classify + template add to a row)
+STORED_COLS = ["Product Solution", "Industry Norm", "Subject Line", "Email Body"]
+_DB_COLS = {"Product Solution": "product", "Industry Norm": "industry_norm",
+            "Subject Line": "subject", "Email Body": "body"}
+
+def row_fingerprints(frame: pd.DataFrame, cols: Sequence[str]) -> np.ndarray:
+    # 64-bit hash per row over the raw values of cols (missing columns hash as NaN), as int64
+    # for SQLite. Categoricals hash by value, so compact mode gives the same fingerprints.
+    missing = pd.Series(np.nan, index=frame.index, dtype=object)
+    key = pd.DataFrame({i: np.asarray(frame.get(c, missing), dtype=object) for i, c in enumerate(cols)})
+    return pd.util.hash_pandas_object(key, index=False).to_numpy().view(np.int64)
+
+def batch_id(file_hashes: Sequence[str]) -> str:
+    # One batch per set of activity files (by content), whatever their names
+    return content_hash("|".join(file_hashes).encode("utf-8"))
+
+@dataclass
+class DeltaCounts:
+    rows: int = 0
+    new: int = 0
+    reused: int = 0
+    processed: int = 0
+    rebuilt: bool = False
+
+    def summary(self) -> str:
+        prefix = "Store rebuilt: " if self.rebuilt else ""
+        return (f"{prefix}{self.new:,} new of {self.rows:,} rows; {self.reused:,} reused from earlier runs, "
+                f"{self.processed:,} classified and templated")
+
+class DeltaStore:
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path)
+        con.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        con.execute("CREATE TABLE IF NOT EXISTS rows (fp INTEGER PRIMARY KEY, first_batch TEXT, last_seen TEXT, "
+                    "industry TEXT, product TEXT, industry_norm TEXT, subject TEXT, body TEXT)")
+        return con
+
+    def meta(self) -> Dict[str, str]:
+        if not os.path.exists(self.path):
+            return {}
+        with self._connect() as con:
+            return dict(con.execute("SELECT key, value FROM meta").fetchall())
+
+    def matches(self, hash_mode: str) -> bool:
+        # Stored emails are only valid for the template version and variant hashing that made them
+        m = self.meta()
+        return m.get("schema") == SCHEMA_VERSION and m.get("hash_mode") == hash_mode
+
+    @staticmethod
+    def _load_query(con: sqlite3.Connection, fps: np.ndarray) -> None:
+        con.execute("CREATE TEMP TABLE IF NOT EXISTS query (fp INTEGER PRIMARY KEY)")
+        con.execute("DELETE FROM query")
+        con.executemany("INSERT OR IGNORE INTO query (fp) VALUES (?)", ((fp,) for fp in np.unique(fps).tolist()))
+
+    def lookup(self, fps: np.ndarray, hash_mode: str) -> pd.DataFrame:
+        # Stored rows for the given fingerprints, indexed by fp: first_batch, industry and STORED_COLS
+        cols = ["first_batch", "industry", *STORED_COLS]
+        if not self.matches(hash_mode):
+            return pd.DataFrame(columns=cols, index=pd.Index([], dtype=np.int64, name="fp"))
+        con = self._connect()
+        try:
+            self._load_query(con, fps)
+            df = pd.read_sql_query(
+                "SELECT r.fp, r.first_batch, r.industry, r.product, r.industry_norm, r.subject, r.body "
+                "FROM rows r JOIN query q ON r.fp = q.fp", con)
+        finally:
+            con.close()
+        df.columns = ["fp", "first_batch", "industry", *STORED_COLS]
+        return df.set_index("fp")
+
+    def record(self, batch: str, fps: np.ndarray, processed_fps: np.ndarray, industry: pd.Series,
+               derived: pd.DataFrame, hash_mode: str) -> bool:
+        # fps: every row of the batch (their last_seen is refreshed); processed_fps / industry /
+        # derived: the rows that were classified and templated, stored or updated in place
+        # (an existing row keeps its first_batch). Returns whether the store was rebuilt.
+        today = time.strftime("%Y-%m-%d")
+        rebuilt = not self.matches(hash_mode)
+        upserts = pd.DataFrame({"fp": processed_fps, "industry": as_db_text(industry).to_numpy()})
+        for c in STORED_COLS:
+            upserts[_DB_COLS[c]] = as_db_text(derived[c]).to_numpy()
+        upserts = upserts.drop_duplicates(subset="fp")
+        con = self._connect()
+        try:
+            with con:
+                if rebuilt:
+                    con.execute("DELETE FROM rows")
+                con.executemany(
+                    "INSERT INTO rows (fp, first_batch, last_seen, industry, product, industry_norm, subject, body) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(fp) DO UPDATE SET industry = excluded.industry, "
+                    "product = excluded.product, industry_norm = excluded.industry_norm, "
+                    "subject = excluded.subject, body = excluded.body",
+                    zip(upserts["fp"].tolist(), [batch] * len(upserts), [today] * len(upserts),
+                        *(upserts[c].tolist() for c in upserts.columns[1:])))
+                self._load_query(con, fps)
+                con.execute("UPDATE rows SET last_seen = ? WHERE fp IN (SELECT fp FROM query)", (today,))
+                cutoff = time.strftime("%Y-%m-%d", time.localtime(time.time() - RETENTION_DAYS * 86400))
+                con.execute("DELETE FROM rows WHERE last_seen < ?", (cutoff,))
+                (n_rows,) = con.execute("SELECT COUNT(*) FROM rows").fetchone()
+                meta = {"schema": SCHEMA_VERSION, "hash_mode": hash_mode, "last_batch": batch,
+                        "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"), "rows": str(n_rows)}
+                con.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta.items())
+        finally:
+            con.close()
+        return rebuilt
@@ -0,0 +1,124 @@
+# diagnostics.py — Per-stage wall time, row counts and memory for a pipeline run
+# ---------------------------------------------------------------------
+# A StageTrace is activated for the current run; pipeline code wraps its steps in step(),
+# which is a no-op when no trace is active. Steps nest (a stage and its sub-steps), and with
+# track_memory the peak / retained Python heap per step is measured with tracemalloc
+# (noticeably slower, so it is opt-in).
+
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+MB = 1024 * 1024
+
+logger = logging.getLogger("unify.diagnostics")
+if not logger.handlers:
+    # One structured line per run on stderr, independent of Streamlit's own logging setup
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_active: ContextVar[Optional["StageTrace"]] = ContextVar("stage_trace", default=None)
+
+def count_rows(obj: Any) -> Optional[int]:
+    # Frames and row-position arrays count their rows; tuples (e.g. the split stage) are summed
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(obj)
+    if isinstance(obj, tuple):
+        counts = [n for n in (count_rows(o) for o in obj) if n is not None]
+        return sum(counts) if counts else None
+    return None
+
+class StageTrace:
+    def __init__(self, track_memory: bool = False):
+        self.track_memory = track_memory
+        self.records: List[Dict[str, Any]] = []
+        self._stack: List[Dict[str, Any]] = []
+        self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        rec: Dict[str, Any] = {"stage": name, "depth": len(self._stack), "status": "computed",
+                               "seconds": None, "rows_in": rows_in, "rows_out": None}
+        self.records.append(rec)
+        frame = {"rec": rec, "peak": 0}
+        if self.track_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            if self._stack:
+                # Keep the parent's peak before resetting it for this step
+                parent = self._stack[-1]
+                parent["peak"] = max(parent["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            frame["before"] = tracemalloc.get_traced_memory()[0]
+        self._stack.append(frame)
+        t0 = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            rec["seconds"] = round(time.perf_counter() - t0, 4)
+            self._stack.pop()
+            if self.track_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, frame["peak"])
+                rec["peak_mb"] = round((peak - frame["before"]) / MB, 2)
+                rec["delta_mb"] = round((current - frame["before"]) / MB, 2)
+                if self._stack:
+                    self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+                elif self._started_tracing:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+
+    def record(self, name: str, seconds: float, rows_out: Optional[int] = None, status: str = "computed") -> None:
+        # A step timed elsewhere (e.g. in a worker thread or process, where step() has no trace)
+        self.records.append({"stage": name, "depth": len(self._stack), "status": status,
+                             "seconds": seconds, "rows_in": None, "rows_out": rows_out})
+
+    def cached(self, name: str, rows_out: Optional[int] = None) -> None:
+        self.record(name, 0.0, rows_out, status="cached")
+
+    @property
+    def total_seconds(self) -> float:
+        return round(sum(r["seconds"] or 0.0 for r in self.records if r["depth"] == 0), 4)
+
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.records)
+        if not df.empty:
+            df["stage"] = ["  " * d + s for d, s in zip(df["depth"], df["stage"])]
+            df = df.drop(columns="depth")
+        return df
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "total_seconds": self.total_seconds,
+                "track_memory": self.track_memory, "stages": self.records}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def log(self) -> None:
+        logger.info("pipeline_trace %s", json.dumps(self.to_dict(), separators=(",", ":")))
+
+def activate(trace: Optional[StageTrace]) -> None:
+    _active.set(trace)
+
+def active() -> Optional[StageTrace]:
+    return _active.get()
+
+@contextmanager
+def step(name: str, rows_in: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    trace = _active.get()
+    if trace is None:
+        yield {}
+        return
+    with trace.stage(name, rows_in) as rec:
+        yield rec
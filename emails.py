@@ -0,0 +1,391 @@
+# emails.py — Subject line / email body templating
+# ---------------------------------------------------------------------
+# Output depends only on (first name, title, account, product, details, industry norm), so
+# generate_emails() factorizes those keys, templates each distinct key once (backed by a
+# bounded LRU across runs) and broadcasts the results back to rows with an index take.
+# Template variants are picked from a stable hash of the account (see HASH_MODES); the
+# default "sha256" mode reproduces every email sent so far. With workers > 1, large runs
+# render the distinct keys in a process pool; chunks are reassembled in key order, so the
+# output is identical to the serial path. Rendering reports the activity rows covered so far
+# to a running background job (see jobs.py).
+
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from classify import clean_text, role_category, safe_str
+from diagnostics import step
+from jobs import JobCancelled, report
+
+EMAIL_CACHE_SIZE = 100_000
+# Parallel rendering: only worth the pool start-up and pickling above this many distinct keys
+PARALLEL_MIN_KEYS = 50_000
+CHUNKS_PER_WORKER = 4
+PROGRESS_KEYS = 20_000  # serial rendering reports progress (and can be cancelled) per this many keys
+
+HASH_MODES = ["sha256", "fast"]
+BODY_PICK_SUFFIXES = ["p1", "p2", "p3", "v", "cta"]
+
+def stable_hashes(keys, mode: str = "sha256") -> np.ndarray:
+    # One hash per key: "sha256" is the first 32 bits of the SHA-256 digest (the historical
+    # picker); "fast" is pandas' vectorized SipHash with its fixed default key.
+    keys = np.asarray(keys, dtype=object)
+    if mode == "fast":
+        return pd.util.hash_array(keys, categorize=False)
+    if mode != "sha256":
+        raise ValueError(f"Unknown hash mode: {mode!r}")
+    return np.fromiter(
+        (int.from_bytes(hashlib.sha256(k.encode("utf-8")).digest()[:4], "big") for k in keys),
+        dtype=np.uint64, count=len(keys),
+    )
+
+def body_pick_table(accounts, mode: str = "sha256") -> np.ndarray:
+    # (len(accounts), 5) raw hashes for the p1/p2/p3/verb/CTA variants of each account.
+    # sha256 keeps the historical per-suffix keys; fast hashes each account once and slices
+    # five 12-bit fields out of the 64-bit hash.
+    accounts = np.asarray(accounts, dtype=object)
+    if mode == "fast":
+        h = stable_hashes(accounts, mode)
+        shifts = np.arange(len(BODY_PICK_SUFFIXES), dtype=np.uint64) * np.uint64(12)
+        return (h[:, None] >> shifts[None, :]) & np.uint64(0xFFF)
+    cols = [stable_hashes(np.array([a + sfx for a in accounts], dtype=object), mode) for sfx in BODY_PICK_SUFFIXES]
+    return np.stack(cols, axis=1) if len(accounts) else np.zeros((0, len(BODY_PICK_SUFFIXES)), dtype=np.uint64)
+
+def deterministic_pick(key: str, n: int, mode: str = "sha256") -> int:
+    if n <= 0: return 0
+    return int(stable_hashes([key], mode)[0]) % n
+
+SUBJECT_THEMES = {
+    "maintenance": {
+        "discrete": [
+            "Cut unplanned downtime on the line with {product}",
+            "Stabilize asset uptime in discrete manufacturing with {product}",
+            "Fewer surprises on critical equipment — {product}"
+        ],
+        "aerospace": [
+            "Improve fleet & ground asset uptime — {product}",
+            "Maintenance leaders in A&D: reduce reactive work with {product}",
+            "A&D uptime without extra headcount — {product}"
+        ],
+        "default": [
+            "Improve asset reliability with {product}",
+            "Cut unplanned downtime — {product}",
+            "Predictable performance from critical assets — {product}"
+        ]
+    },
+    "quality": {
+        "default": [
+            "Faster quality cycles & cleaner audits — {product}",
+            "Reduce compliance friction with {product}",
+            "Make quality predictable with {product}"
+        ]
+    },
+    "projects": {
+        "default": [
+            "Project controls that hold the line — {product}",
+            "Stop late surprises in cost & schedule — {product}",
+            "Forecast accuracy that sticks — {product}"
+        ]
+    },
+    "operations": {
+        "default": [
+            "Make operations predictable with {product}",
+            "Control variability across shifts — {product}",
+            "Fewer bottlenecks, clearer flow — {product}"
+        ]
+    },
+    "engineering": {
+        "default": [
+            "Deliver designs faster with {product}",
+            "Reduce rework & surprises — {product}",
+            "Cleaner models, cleaner handoffs — {product}"
+        ]
+    },
+    "safety": {
+        "default": [
+            "Lower incident risk without slowing the line — {product}",
+            "Simplify compliance and improve safety — {product}",
+            "Fewer near-misses with better visibility — {product}"
+        ]
+    },
+    "it": {
+        "default": [
+            "Less tool sprawl, clearer outcomes — {product}",
+            "Integrations without the drag — {product}",
+            "Operate with a simpler stack — {product}"
+        ]
+    },
+    "vp": {
+        "default": [
+            "Improve predictability without adding complexity — {product}",
+            "Visibility you can act on — {product}",
+            "Hold the line on margin with {product}"
+        ]
+    },
+    "exec": {
+        "default": [
+            "Improve margin predictability with {product}",
+            "Operational confidence across sites — {product}",
+            "Clarity on reliability, quality & cost — {product}"
+        ]
+    },
+    "director": {
+        "default": [
+            "Boost cross-team visibility — {product}",
+            "Make execution repeatable with {product}",
+            "Fewer fires, more follow-through — {product}"
+        ]
+    },
+    "manager": {
+        "default": [
+            "Hit targets with less churn — {product}",
+            "Keep teams moving in the same direction — {product}",
+            "Less busywork, more progress — {product}"
+        ]
+    },
+    "ic": {
+        "default": [
+            "Remove busywork and move faster — {product}",
+            "Make work easier with {product}",
+            "Clarity to execute — {product}"
+        ]
+    }
+}
+
+ROLE_P1 = {
+    "maintenance": ["You’re asked to keep uptime high with constrained headcount.", "Manual PMs miss early failure signals."],
+    "quality": ["Audits and deviations slow teams down.", "Teams chase documents across silos."],
+    "projects": ["Forecast accuracy slips as change orders stack up.", "Cost control is fragile without a clear source of truth."],
+    "operations": ["Throughput swings with schedule volatility.", "Firefighting replaces flow when visibility is late."],
+    "engineering": ["Late clashes force expensive changes.", "Design cycles stretch when models aren’t aligned."],
+    "safety": ["Incidents rise when reporting is fragmented.", "Compliance pulls time from proactive safety work."],
+    "it": ["Integrations inflate cost while ops still lack clear signal.", "Maintaining brittle connections slows initiatives."],
+    "vp": ["Hard to improve predictability without adding complexity.", "Targets compete without clear visibility."],
+    "exec": ["Board-level targets require repeatable execution.", "Confidence erodes when risk is invisible until late."],
+    "director": ["Cross-team consistency is hard without bureaucracy.", "Leaders end up firefighting instead of driving change."],
+    "manager": ["Coordinating under pressure leads to churn and misses.", "Getting consistent execution is hard."],
+    "ic": ["Disconnected tools slow delivery.", "Workarounds pile up when process isn’t clear."]
+}
+ROLE_P2 = {
+    "maintenance": ["Left unresolved, it drives firefighting and lost production.", "The cost shows up as overtime and missed targets."],
+    "quality": ["Unresolved, it prolongs investigations and risks customer trust.", "It becomes margin drag through scrap and rework."],
+    "projects": ["Unresolved, it erodes margin and forces late cuts.", "It leads to unpredictable forecasts."],
+    "operations": ["Unresolved, it causes schedule misses and unstable output.", "It keeps teams reactive."],
+    "engineering": ["Unresolved, it creates rework and missed launch milestones.", "It adds expensive late fixes."],
+    "safety": ["Unresolved, it elevates risk and drags productivity.", "It exposes the business to incidents."],
+    "it": ["Unresolved, it inflates TCO and stalls initiatives.", "Unresolved, it creates shadow IT."],
+    "vp": ["Unresolved, it clouds forecasting and compresses margins.", "It makes planning fragile."],
+    "exec": ["Unresolved, it undermines predictability and confidence.", "It leaves strategy vulnerable."],
+    "director": ["Unresolved, it blocks visibility and creates fires.", "It derails roadmaps."],
+    "manager": ["Unresolved, it causes churn and KPI misses.", "It makes it hard to coach."],
+    "ic": ["Unresolved, it adds busywork and slows delivery.", "It keeps the signal buried in noise."]
+}
+
+PRODUCT_P3 = {
+    "HxGN EAM/APM": ["Move to predictable uptime: connected asset data, prioritized work.", "Earlier signals, planned interventions, extended asset life."],
+    "HxGN APM": ["Spot risks earlier and act before failures.", "Reliability gains from early detection."],
+    "ETQ": ["Faster closings, automated evidence, and cleaner audits.", "Quality that flows without delays."],
+    "Ecosys": ["Project controls that hold the line.", "See slippage sooner and act with confidence."],
+    "Scanner": ["Quicker inspections and faster issue detection.", "Close the loop faster between measurement and correction."],
+    "CADWorx": ["Fewer clashes and faster design cycles.", "Intelligent models reduce rework."],
+    "CAESAR II": ["Trusted stress analysis for safer designs.", "Decisions backed by industry-standard analysis."],
+    "J5/AKMS": ["Standardize shift handover and logs.", "Create operational clarity across teams."],
+    "AKMS": ["Codify best practices and reduce error.", "Make procedures easy to follow and auditable."],
+    "N/A": ["Clearer execution and measurable outcomes.", "Predictability without adding complexity."]
+}
+PRODUCT_P3_VERB = {
+    "HxGN EAM/APM": ["move from reactive to reliable", "plan work before it breaks"],
+    "HxGN APM": ["act before failures", "prioritize by risk"],
+    "ETQ": ["cut audit drag", "shorten quality cycles"],
+    "Ecosys": ["hold the line on cost", "forecast with confidence"],
+    "Scanner": ["speed up inspection", "catch issues earlier"],
+    "CADWorx": ["deliver designs faster", "reduce rework"],
+    "CAESAR II": ["de-risk piping decisions", "accelerate approvals"],
+    "J5/AKMS": ["standardize operations", "create transparency across shifts"],
+    "AKMS": ["codify procedures", "reduce human-factor errors"],
+    "N/A": ["improve execution", "create clarity"]
+}
+CTA_P4 = [
+    "Would a 20-minute discussion next week be useful to compare how others in {industry} approach this?",
+    "Open to a brief session next week to benchmark {industry} peers and quantify impact?",
+    "Would a quick 20-min chat help explore where {product} could remove friction in {industry}?"
+]
+
+def _render_subject(product: str, title: str, industry_norm: str, account: str, h: int) -> str:
+    a = safe_str(account)
+    t = safe_str(title)
+    p = safe_str(product)
+    ind = safe_str(industry_norm)
+    cat = role_category(t)
+    pool = SUBJECT_THEMES.get(cat, SUBJECT_THEMES["ic"])
+    choices = pool.get(ind, pool.get("default", ["Improve performance with {product}"]))
+    idx = h % len(choices)
+    return choices[idx].format(product=p)
+
+def subject_line(product: str, title: str, industry_norm: str, account: str, hash_mode: str = "sha256") -> str:
+    key = safe_str(account) + safe_str(title) + safe_str(product)
+    return _render_subject(product, title, industry_norm, account, int(stable_hashes([key], hash_mode)[0]))
+
+def _render_body(first: str, title: str, account: str, product: str, details: str, industry_norm: str,
+                 picks: Tuple[int, ...]) -> str:
+    fn = safe_str(first).title()
+    ttl = safe_str(title)
+    acct = safe_str(account)
+    prod = safe_str(product)
+    det = safe_str(details) or "the page you explored"
+    ind_read = {
+        "discrete": "discrete manufacturing",
+        "aerospace": "aerospace & defense",
+        "energy": "energy / oil & gas",
+        "lifesciences": "life sciences",
+        "foodbev": "food & beverage",
+        "chemicals": "chemicals",
+        "utilities": "utilities",
+        "mining": "mining & metals",
+        "hitech": "electronics / high-tech",
+        "other": "your industry"
+    }.get(industry_norm or "discrete", "your industry")
+
+    cat = role_category(ttl)
+    p1_choices = ROLE_P1.get(cat, ROLE_P1["ic"])
+    p2_choices = ROLE_P2.get(cat, ROLE_P2["ic"])
+    p3_choices = PRODUCT_P3.get(prod, PRODUCT_P3["N/A"])
+    verb_choices = PRODUCT_P3_VERB.get(prod, PRODUCT_P3_VERB["N/A"])
+
+    h1, h2, h3, h4, h5 = picks
+    i1 = h1 % len(p1_choices)
+    i2 = h2 % len(p2_choices)
+    i3 = h3 % len(p3_choices)
+    i4 = h4 % len(verb_choices)
+    i5 = h5 % len(CTA_P4)
+
+    greeting = f"Hi {fn}," if fn else "Hello,"
+    para1 = f"{greeting} as a {ttl or 'professional'} at {acct}, teams often face the same challenge: {p1_choices[i1]}"
+    para2 = f"{p2_choices[i2]} Leaders we work with in {ind_read} want fewer surprises and clearer signal."
+    para3 = f"{p3_choices[i3]} In short, {verb_choices[i4]} without adding complexity."
+    para4 = CTA_P4[i5].format(industry=ind_read, product=prod) + f" I can tailor it to your context and the interest we saw around \"{det}\"."
+
+    signature = (
+        "—\n"
+        "Best regards,\n"
+        "<Your Name>\n"
+        "Hexagon\n"
+        "<Phone> | <Email>"
+    )
+
+    return "\n\n".join([para1, para2, para3, para4, signature])
+
+def build_email_body(first: str, title: str, account: str, product: str, details: str, industry_norm: str,
+                     hash_mode: str = "sha256") -> str:
+    picks = tuple(int(h) for h in body_pick_table([safe_str(account)], hash_mode)[0])
+    return _render_body(first, title, account, product, details, industry_norm, picks)
+
+# -----------------------------
+# Memoized generation
+# -----------------------------
+@lru_cache(maxsize=EMAIL_CACHE_SIZE)
+def _subject_cached(product: str, title: str, industry_norm: str, account: str, h: int) -> str:
+    return _render_subject(product, title, industry_norm, account, h)
+
+@lru_cache(maxsize=EMAIL_CACHE_SIZE)
+def _body_cached(first: str, title: str, account: str, product: str, details: str, industry_norm: str,
+                 picks: Tuple[int, ...]) -> str:
+    return _render_body(first, title, account, product, details, industry_norm, picks)
+
+def _render_rows(rows: Sequence[Tuple]) -> Tuple[List[str], List[str]]:
+    # rows: (first, title, account, product, details, industry, subject hash, body picks)
+    subjects, bodies = [], []
+    for fn, ttl, acct, prod, det, ind, h, picks in rows:
+        subjects.append(_subject_cached(prod, ttl, ind, acct, h))
+        bodies.append(_body_cached(fn, ttl, acct, prod, det, ind, picks))
+    return subjects, bodies
+
+def _render_chunked(rows: Sequence[Tuple], row_counts: np.ndarray) -> Tuple[List[str], List[str]]:
+    # _render_rows in blocks of PROGRESS_KEYS, reporting the activity rows covered so far
+    subjects: List[str] = []
+    bodies: List[str] = []
+    covered = np.cumsum(row_counts)
+    for start in range(0, len(rows), PROGRESS_KEYS):
+        chunk_subjects, chunk_bodies = _render_rows(rows[start:start + PROGRESS_KEYS])
+        subjects.extend(chunk_subjects)
+        bodies.extend(chunk_bodies)
+        report(done=int(covered[len(subjects) - 1]))
+    return subjects, bodies
+
+def _render_parallel(rows: Sequence[Tuple], workers: int, row_counts: np.ndarray) -> Tuple[List[str], List[str]]:
+    # Contiguous chunks, mapped in order, so concatenating the results restores key order
+    size = -(-len(rows) // (workers * CHUNKS_PER_WORKER))
+    chunks = [rows[i:i + size] for i in range(0, len(rows), size)]
+    subjects: List[str] = []
+    bodies: List[str] = []
+    covered = np.cumsum(row_counts)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        for chunk_subjects, chunk_bodies in pool.map(_render_rows, chunks):
+            subjects.extend(chunk_subjects)
+            bodies.extend(chunk_bodies)
+            report(done=int(covered[len(subjects) - 1]))
+    except JobCancelled:
+        # map() queued every chunk; drop the ones not started instead of waiting for them
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return subjects, bodies
+
+def _shared_strings(rendered: np.ndarray, codes: np.ndarray, index: pd.Index) -> pd.Series:
+    # Distinct keys can render the same text, so factorize again before building the categories
+    text_codes, texts = pd.factorize(rendered)
+    return pd.Series(pd.Categorical.from_codes(text_codes[codes], categories=texts), index=index)
+
+def generate_emails(first: pd.Series, title: pd.Series, account: pd.Series, product: pd.Series,
+                    details: pd.Series, industry_norm: pd.Series,
+                    hash_mode: str = "sha256", compact: bool = False, workers: int = 1,
+                    parallel_min_keys: int = PARALLEL_MIN_KEYS) -> Tuple[pd.Series, pd.Series, int]:
+    # Returns (subjects, bodies, number of distinct keys templated). With compact, the columns
+    # are categoricals over the rendered strings, so repeated emails are stored once.
+    keys = pd.DataFrame({
+        "first": clean_text(first), "title": clean_text(title), "account": clean_text(account),
+        "product": clean_text(product), "details": clean_text(details), "industry": clean_text(industry_norm),
+    })
+    if keys.empty:
+        empty = pd.Series([], index=account.index, dtype=object)
+        return empty, empty.copy(), 0
+
+    with step("factorize email keys", len(keys)) as rec:
+        codes = keys.groupby(list(keys.columns), sort=False).ngroup().to_numpy()
+        uniques = keys.drop_duplicates()
+        rec["rows_out"] = len(uniques)
+
+    # Variant picks: each distinct account / subject key is hashed once for the whole run
+    with step("variant hashes", len(uniques)):
+        acct_codes, acct_uniques = pd.factorize(uniques["account"])
+        picks = body_pick_table(acct_uniques, hash_mode).tolist()
+        subj_codes, subj_uniques = pd.factorize(uniques["account"] + uniques["title"] + uniques["product"])
+        subj_hashes = stable_hashes(subj_uniques, hash_mode).tolist()
+
+    # One tuple per distinct key: the template inputs plus its precomputed variant hashes
+    rows = list(zip(*(uniques[c].tolist() for c in keys.columns),
+                    (subj_hashes[c] for c in subj_codes), (tuple(picks[c]) for c in acct_codes)))
+    # Activity rows per distinct key (in key order), for progress reporting
+    row_counts = np.bincount(codes, minlength=len(uniques))
+    with step("render Subject Line / Email Body", len(uniques)) as rec:
+        if workers > 1 and len(rows) >= parallel_min_keys:
+            rec["workers"] = workers
+            rendered = _render_parallel(rows, workers, row_counts)
+        else:
+            rendered = _render_chunked(rows, row_counts)
+        subjects = np.empty(len(rows), dtype=object)
+        bodies = np.empty(len(rows), dtype=object)
+        subjects[:], bodies[:] = rendered
+
+    if compact:
+        return _shared_strings(subjects, codes, account.index), _shared_strings(bodies, codes, account.index), len(uniques)
+    return (
+        pd.Series(subjects.take(codes), index=account.index, dtype=object),
+        pd.Series(bodies.take(codes), index=account.index, dtype=object),
+        len(uniques),
+    )
@@ -0,0 +1,161 @@
+# exports.py — Chunked export writers for the pipeline outputs
+# ---------------------------------------------------------------------
+# Output frames are written in row chunks straight into the target stream (plain or gzip CSV,
+# Parquet row groups, write-only XLSX), so no full CSV string is built alongside its encoded
+# bytes. bundle_bytes() writes several outputs (e.g. one per rep) into one ZIP.
+
+import gzip
+import io
+import re
+import zipfile
+from typing import BinaryIO, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+EXPORT_CHUNK_ROWS = 50_000
+XLSX_MAX_ROWS = 1_048_575  # sheet limit, minus the header row
+
+# format -> (file extension, mime type)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    "csv": (".csv", "text/csv"),
+    "csv.gz": (".csv.gz", "application/gzip"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+ZIP_MIME = "application/zip"
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+def _chunks(frame: pd.DataFrame, chunksize: int):
+    for start in range(0, len(frame), chunksize):
+        yield frame.iloc[start:start + chunksize]
+
+def _write_csv(frame: pd.DataFrame, fh: BinaryIO, chunksize: int) -> None:
+    text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+    try:
+        if not len(frame):
+            frame.to_csv(text, index=False)
+        for i, chunk in enumerate(_chunks(frame, chunksize)):
+            chunk.to_csv(text, index=False, header=i == 0)
+        text.flush()
+    finally:
+        text.detach()  # leave fh open for the caller
+
+def _arrow_schema(frame: pd.DataFrame):
+    import pyarrow as pa
+
+    # Numeric columns keep their type; everything else is written as (nullable) strings so
+    # every row group has the same schema regardless of what its chunk happens to contain
+    fields = []
+    for c in frame.columns:
+        dtype = frame[c].dtype
+        if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+            fields.append(pa.field(str(c), pa.from_numpy_dtype(dtype)))
+        else:
+            fields.append(pa.field(str(c), pa.string()))
+    return pa.schema(fields)
+
+def _arrow_table(chunk: pd.DataFrame, schema):
+    import pyarrow as pa
+
+    arrays = []
+    for c, field in zip(chunk.columns, schema):
+        values = chunk[c]
+        if pa.types.is_string(field.type):
+            obj = values.astype(object)
+            mask = obj.isna().to_numpy()
+            arrays.append(pa.array(np.where(mask, None, obj.astype(str)), type=pa.string()))
+        else:
+            arrays.append(pa.array(values.to_numpy(), type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def _write_parquet(frame: pd.DataFrame, fh: BinaryIO, chunksize: int) -> None:
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(frame)
+    with pq.ParquetWriter(fh, schema, compression="zstd") as writer:
+        for chunk in _chunks(frame, chunksize):
+            writer.write_table(_arrow_table(chunk, schema))
+
+def _xlsx_values(ws, values: pd.Series) -> np.ndarray:
+    # Cell values for one column: control characters openpyxl rejects are dropped, and strings
+    # starting with "=" are written as text cells instead of live formulas
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    out = values.astype(object).where(values.notna(), None).to_numpy(dtype=object, copy=True)
+    pos = np.flatnonzero([isinstance(v, str) for v in out])
+    if not len(pos):
+        return out
+    text = pd.Series(out[pos], dtype=object).str.replace(ILLEGAL_CHARACTERS_RE, "", regex=True)
+    out[pos] = text.to_numpy(dtype=object)
+    for i in pos[text.str.startswith("=").to_numpy(dtype=bool)]:
+        cell = WriteOnlyCell(ws, out[i])
+        cell.data_type = "s"
+        out[i] = cell
+    return out
+
+def _write_xlsx(frame: pd.DataFrame, fh: BinaryIO, chunksize: int) -> None:
+    from openpyxl import Workbook
+
+    if len(frame) > XLSX_MAX_ROWS:
+        raise ValueError(f"{len(frame):,} rows exceed the XLSX sheet limit; export as CSV or Parquet instead")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(list(_xlsx_values(ws, pd.Series([str(c) for c in frame.columns], dtype=object))))
+    for chunk in _chunks(frame, chunksize):
+        columns = [_xlsx_values(ws, chunk.iloc[:, j]) for j in range(chunk.shape[1])]
+        for row in zip(*columns):
+            ws.append(row)
+    wb.save(fh)
+
+_WRITERS = {"csv": _write_csv, "parquet": _write_parquet, "xlsx": _write_xlsx}
+
+def write_export(frame: pd.DataFrame, fmt: str, fh: BinaryIO, chunksize: int = EXPORT_CHUNK_ROWS) -> None:
+    if fmt == "csv.gz":
+        # mtime=0 keeps the archive bytes identical across runs
+        with gzip.GzipFile(fileobj=fh, mode="wb", mtime=0) as gz:
+            _write_csv(frame, gz, chunksize)
+        return
+    if fmt not in _WRITERS:
+        raise ValueError(f"unknown export format: {fmt}")
+    _WRITERS[fmt](frame, fh, chunksize)
+
+def export_bytes(frame: pd.DataFrame, fmt: str, chunksize: int = EXPORT_CHUNK_ROWS) -> bytes:
+    buf = io.BytesIO()
+    write_export(frame, fmt, buf, chunksize)
+    return buf.getvalue()
+
+def export_name(stem: str, fmt: str) -> str:
+    return stem + EXPORT_FORMATS[fmt][0]
+
+def partition_stems(labels: Sequence[str]) -> List[str]:
+    # File-system safe, unique file stems for partition labels (e.g. rep names)
+    stems: List[str] = []
+    used = set()
+    for label in labels:
+        base = _UNSAFE.sub("_", str(label)).strip("._") or "partition"
+        stem, n = base, 1
+        while stem.casefold() in used:  # case-insensitive file systems
+            n += 1
+            stem = f"{base}_{n}"
+        used.add(stem.casefold())
+        stems.append(stem)
+    return stems
+
+def bundle_bytes(entries: Iterable[Tuple[str, pd.DataFrame]], fmt: str = "csv", chunksize: int = EXPORT_CHUNK_ROWS,
+                 extra: Optional[Dict[str, bytes]] = None) -> bytes:
+    # entries: (file stem, output frame) pairs, each written as one entry of the ZIP; a generator
+    # keeps only one frame alive at a time. extra: additional files (e.g. a manifest) as bytes.
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for stem, frame in entries:
+            with zf.open(export_name(stem, fmt), "w", force_zip64=True) as entry:
+                if fmt in ("csv", "csv.gz"):
+                    write_export(frame, fmt, entry, chunksize)
+                else:
+                    # Parquet / XLSX writers need a seekable target; stage them in memory
+                    entry.write(export_bytes(frame, fmt, chunksize))
+        for name, data in (extra or {}).items():
+            zf.writestr(name, data)
+    return buf.getvalue()
@@ -0,0 +1,106 @@
+# fuzzy.py — Blocking-index fuzzy matching of account names against master keys
+# ---------------------------------------------------------------------
+# Names are canonicalized (punctuation and trailing legal suffixes dropped, so "Acme Corp." and
+# "ACME Corporation" both become "acme") and split into padded character trigrams. An
+# inverted index over the master trigrams yields a handful of candidates per query, which
+# are scored with the Dice coefficient of the two trigram sets. Work per query is bounded by
+# its (capped) posting lists, so matching scales with the number of distinct queries.
+# Numbers in a name must match exactly ("Globex 3" is not "Globex 34"), and a query whose two
+# best candidates score within AMBIGUITY_MARGIN of each other is left unmatched.
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+NGRAM = 3
+TOP_K = 10
+AMBIGUITY_MARGIN = 0.02  # best candidate must beat the runner-up by more than this
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "llc", "llp", "lp", "ltd",
+    "limited", "plc", "gmbh", "ag", "sa", "sas", "srl", "bv", "nv", "pte", "pty", "oy", "ab", "as", "kk",
+    "group", "holdings",
+}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_NUMBER = re.compile(r"[0-9]+")
+
+def canonical_name(name: str) -> str:
+    # Periods are dropped rather than spaced, so "L.L.C." reads as "llc". Legal suffixes only
+    # count at the end of the name ("Co Op Foods" keeps its "co"), and a leading "the" goes.
+    s = _NON_ALNUM.sub(" ", str(name).casefold().replace("&", " and ").replace(".", ""))
+    tokens = s.split()
+    if tokens and tokens[0] == "the":
+        tokens = tokens[1:]
+    while len(tokens) > 1 and tokens[-1] in LEGAL_SUFFIXES:
+        tokens.pop()
+    return " ".join(tokens)
+
+def name_numbers(canonical: str) -> Tuple[str, ...]:
+    return tuple(_NUMBER.findall(canonical))
+
+def name_grams(canonical: str, n: int = NGRAM) -> Set[str]:
+    if not canonical:
+        return set()
+    padded = f" {canonical} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+def dice(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+class FuzzyIndex:
+    def __init__(self, keys: Sequence[str], max_postings: int = 0, top_k: int = TOP_K):
+        self.keys = list(keys)
+        self.top_k = top_k
+        canonical = [canonical_name(k) for k in self.keys]
+        self._grams: List[Set[str]] = [name_grams(c) for c in canonical]
+        # Candidates are restricted to keys with the same numbers, compared by code
+        self._number_codes: Dict[Tuple[str, ...], int] = {}
+        self._numbers = np.array([self._number_codes.setdefault(name_numbers(c), len(self._number_codes))
+                                  for c in canonical], dtype=np.int64)
+        postings = defaultdict(list)
+        for i, grams in enumerate(self._grams):
+            for g in grams:
+                postings[g].append(i)
+        self._postings = {g: np.asarray(ids, dtype=np.int64) for g, ids in postings.items()}
+        # Trigrams shared by a large share of the master ("ing", " co") are skipped for
+        # candidate generation; they carry little signal and dominate the cost.
+        self.max_postings = max_postings or max(500, len(self.keys) // 50)
+
+    def lookup(self, name: str) -> Tuple[int, float]:
+        # Best key position and score; -1 when there is no candidate or the best one is not
+        # clearly ahead of the runner-up (the score is still returned)
+        canonical = canonical_name(name)
+        grams = name_grams(canonical)
+        code = self._number_codes.get(name_numbers(canonical))
+        lists = sorted((self._postings[g] for g in grams if g in self._postings), key=len)
+        if code is None or not lists:
+            return -1, 0.0
+        usable = [p for p in lists if len(p) <= self.max_postings] or lists[:1]
+        ids, counts = np.unique(np.concatenate(usable), return_counts=True)
+        same_numbers = self._numbers[ids] == code
+        ids, counts = ids[same_numbers], counts[same_numbers]
+        candidates = ids[np.argsort(-counts, kind="stable")[:self.top_k]]
+        best, best_score, runner_up = -1, 0.0, 0.0
+        for i in candidates:
+            score = dice(grams, self._grams[i])
+            if score > best_score:
+                best, best_score, runner_up = int(i), score, best_score
+            elif score > runner_up:
+                runner_up = score
+        if best_score - runner_up <= AMBIGUITY_MARGIN:
+            return -1, best_score
+        return best, best_score
+
+    def match(self, names: Sequence[str], threshold: float) -> Tuple[np.ndarray, np.ndarray]:
+        # Position of the best master key per name (-1 below threshold) and its score
+        positions = np.full(len(names), -1, dtype=np.int64)
+        scores = np.zeros(len(names), dtype=float)
+        for j, name in enumerate(names):
+            pos, score = self.lookup(name)
+            scores[j] = score
+            if pos >= 0 and score >= threshold:
+                positions[j] = pos
+        return positions, scores
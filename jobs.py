@@ -0,0 +1,147 @@
+# jobs.py — Background pipeline jobs with progress reporting and cancellation
+# ---------------------------------------------------------------------
+# A JobManager (one per server process; app.py keeps it in st.cache_resource) runs pipeline work
+# on a worker thread. Jobs are keyed by a fingerprint of their inputs, so a browser refresh or a
+# widget change that leads back to the same inputs finds the running or finished job instead of
+# starting over. Pipeline code reports progress with report() and honours cancellation there
+# and at checkpoint(); both are no-ops outside a job, like diagnostics.step().
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+# One run at a time: concurrent runs would only compete for the same cores and memory
+MAX_WORKERS = 1
+MAX_FINISHED_JOBS = 4  # finished jobs kept for later reruns / sessions (status and timings)
+# Results (stages) of a finished job nobody collected, e.g. after the session went away, are
+# dropped after this long
+FINISHED_RESULT_SECONDS = 300
+
+class JobCancelled(Exception):
+    pass
+
+@dataclass
+class Job:
+    key: str
+    status: str = QUEUED
+    stage: str = ""
+    rows_done: int = 0
+    rows_total: int = 0
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    stage_started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: str = ""
+    result: Any = None
+    # Stage results the job fills (a StageRunner store), picked up by the next script run
+    stages: Dict[str, Any] = field(default_factory=dict)
+    released: bool = False
+    cancel_requested: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def cancel(self) -> None:
+        self.cancel_requested.set()
+
+    def release(self) -> Dict[str, Any]:
+        # Hands over the stage results and drops them (and the result) from the job, which then
+        # only keeps its status and timings
+        stages, self.stages, self.result, self.released = self.stages, {}, None, True
+        return stages
+
+    def elapsed_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def eta_seconds(self) -> Optional[float]:
+        # Time left in the current stage at its rate so far
+        if not self.rows_done or self.stage_started_at is None or self.rows_done >= self.rows_total:
+            return None
+        elapsed = time.time() - self.stage_started_at
+        return elapsed * (self.rows_total - self.rows_done) / self.rows_done
+
+_current: ContextVar[Optional[Job]] = ContextVar("pipeline_job", default=None)
+
+def checkpoint() -> None:
+    job = _current.get()
+    if job is not None and job.cancel_requested.is_set():
+        raise JobCancelled(job.key)
+
+def report(stage: Optional[str] = None, done: Optional[int] = None, total: Optional[int] = None) -> None:
+    # Progress of the current job: a new stage resets the row counts; also a cancellation point
+    job = _current.get()
+    if job is None:
+        return
+    if stage is not None and stage != job.stage:
+        job.stage, job.stage_started_at, job.rows_done = stage, time.time(), 0
+    if total is not None:
+        job.rows_total = total
+    if done is not None:
+        job.rows_done = done
+    checkpoint()
+
+class JobManager:
+    def __init__(self, max_workers: int = MAX_WORKERS, keep: int = MAX_FINISHED_JOBS):
+        self.keep = keep
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline-job")
+
+    def get(self, key: str) -> Optional[Job]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(key)
+
+    def submit(self, key: str, fn: Callable[[Job], Any], restart: bool = False) -> Job:
+        # The existing job for key (whatever its status) unless restart; fn(job) runs on the
+        # worker thread and its return value becomes job.result
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and (job.active or not restart):
+                self._jobs.move_to_end(key)
+                return job
+            job = Job(key)
+            self._jobs[key] = job
+            self._prune()
+        self._pool.submit(self._run, job, fn)
+        return job
+
+    def cancel(self, key: str) -> None:
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is not None and job.active:
+            job.cancel()
+
+    def _prune(self) -> None:
+        finished = [k for k, job in self._jobs.items() if not job.active]
+        for k in finished[:max(0, len(finished) - self.keep)]:
+            del self._jobs[k]
+        cutoff = time.time() - FINISHED_RESULT_SECONDS
+        for job in self._jobs.values():
+            if not job.active and not job.released and job.finished_at is not None and job.finished_at < cutoff:
+                job.release()
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]) -> None:
+        token = _current.set(job)
+        try:
+            checkpoint()  # cancelled while queued
+            job.status, job.started_at = RUNNING, time.time()
+            job.result = fn(job)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:  # surfaced in the UI; the worker thread must not die
+            job.status, job.error = FAILED, f"{type(e).__name__}: {e}"
+        finally:
+            job.finished_at = time.time()
+            _current.reset(token)
+            with self._lock:
+                self._prune()
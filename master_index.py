@@ -0,0 +1,139 @@
+# master_index.py — Persistent SQLite index of the normalized master lookup
+# ---------------------------------------------------------------------
+# Stores master_slim (__acct_key__ -> rep, industry) in a local SQLite file so later sessions
+# load it without re-reading the workbook. Refreshing from a new master applies only the
+# added / removed / changed accounts and reports a diff summary.
+
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import pandas as pd
+
+DEFAULT_INDEX_PATH = "master_index.sqlite"
+SCHEMA_VERSION = "2"
+
+@dataclass
+class MasterDiff:
+    added: int = 0
+    removed: int = 0
+    reassigned: int = 0
+    industry_changed: int = 0
+    rebuilt: bool = False
+    # One row per changed account: __acct_key__, change, old/new rep
+    changes: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    @property
+    def total(self) -> int:
+        return self.added + self.removed + self.reassigned + self.industry_changed
+
+    def summary(self) -> str:
+        prefix = "Index rebuilt: " if self.rebuilt else ""
+        return (f"{prefix}{self.added:,} added, {self.removed:,} removed, {self.reassigned:,} re-assigned, "
+                f"{self.industry_changed:,} industry changes")
+
+def as_db_text(values: pd.Series) -> pd.Series:
+    # Column values as SQLite TEXT parameters: str(), with NaN/None as NULL
+    s = values.astype(object)
+    return s.where(s.notna(), None).map(lambda v: v if v is None else str(v))
+
+class MasterIndex:
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        con = sqlite3.connect(self.path)
+        con.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        con.execute("CREATE TABLE IF NOT EXISTS accounts (acct_key TEXT PRIMARY KEY, rep TEXT, industry TEXT, name TEXT)")
+        return con
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) and bool(self.meta())
+
+    def meta(self) -> Dict[str, str]:
+        if not os.path.exists(self.path):
+            return {}
+        with self._connect() as con:
+            return dict(con.execute("SELECT key, value FROM meta").fetchall())
+
+    def matches(self, rep_col: str, ind_col: Optional[str], normalize_names: bool) -> bool:
+        m = self.meta()
+        return (m.get("schema") == SCHEMA_VERSION and m.get("rep_col") == rep_col
+                and m.get("ind_col", "") == (ind_col or "") and m.get("normalize_names") == str(normalize_names))
+
+    def load(self) -> pd.DataFrame:
+        # master_slim layout: __acct_key__, rep column[, industry column] under their master names,
+        # then __master_name__
+        m = self.meta()
+        con = self._connect()
+        try:
+            df = pd.read_sql_query("SELECT acct_key, rep, industry, name FROM accounts", con)
+        finally:
+            con.close()
+        cols = {"acct_key": "__acct_key__", "rep": m["rep_col"]}
+        if m.get("ind_col"):
+            cols["industry"] = m["ind_col"]
+        cols["name"] = "__master_name__"
+        return df[list(cols)].rename(columns=cols)
+
+    def refresh(self, master_slim: pd.DataFrame, rep_col: str, ind_col: Optional[str],
+                normalize_names: bool, source_hash: str = "") -> MasterDiff:
+        new = pd.DataFrame({
+            "acct_key": master_slim["__acct_key__"].astype(str),
+            "rep": as_db_text(master_slim[rep_col]),
+            "industry": as_db_text(master_slim[ind_col]) if ind_col else None,
+            "name": as_db_text(master_slim["__master_name__"]),
+        })
+        rebuilt = not self.matches(rep_col, ind_col, normalize_names)
+        con = self._connect()
+        try:
+            with con:
+                if rebuilt:
+                    con.execute("DROP TABLE IF EXISTS accounts")
+                    con.execute("CREATE TABLE accounts (acct_key TEXT PRIMARY KEY, rep TEXT, industry TEXT, name TEXT)")
+                old = pd.read_sql_query("SELECT acct_key, rep, industry, name FROM accounts", con)
+                diff, upserts, deletes = _diff(old, new)
+                diff.rebuilt = rebuilt
+                con.executemany("DELETE FROM accounts WHERE acct_key = ?", [(k,) for k in deletes])
+                con.executemany("INSERT OR REPLACE INTO accounts (acct_key, rep, industry, name) VALUES (?, ?, ?, ?)",
+                                upserts.itertuples(index=False, name=None))
+                meta = {
+                    "schema": SCHEMA_VERSION, "rep_col": rep_col, "ind_col": ind_col or "",
+                    "normalize_names": str(normalize_names), "source_hash": source_hash,
+                    "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"), "rows": str(len(new)),
+                }
+                con.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", meta.items())
+        finally:
+            con.close()
+        return diff
+
+def _diff(old: pd.DataFrame, new: pd.DataFrame):
+    both = old.merge(new, on="acct_key", how="outer", suffixes=("_old", "_new"), indicator=True)
+    added = both["_merge"] == "right_only"
+    removed = both["_merge"] == "left_only"
+    common = both["_merge"] == "both"
+    # NULL-safe inequality
+    rep_changed = common & (both["rep_old"].fillna("\0") != both["rep_new"].fillna("\0"))
+    ind_changed = common & ~rep_changed & (both["industry_old"].fillna("\0") != both["industry_new"].fillna("\0"))
+    # Display-name edits are applied but not reported
+    renamed = common & ~rep_changed & ~ind_changed & (both["name_old"].fillna("\0") != both["name_new"].fillna("\0"))
+
+    change = pd.Series("", index=both.index, dtype=object)
+    change[added] = "added"
+    change[removed] = "removed"
+    change[rep_changed] = "re-assigned"
+    change[ind_changed] = "industry changed"
+    changed = change != ""
+    changes = pd.DataFrame({
+        "__acct_key__": both["acct_key"], "change": change,
+        "old rep": both["rep_old"], "new rep": both["rep_new"],
+    })[changed].reset_index(drop=True)
+
+    upsert_mask = added | rep_changed | ind_changed | renamed
+    upserts = both.loc[upsert_mask, ["acct_key", "rep_new", "industry_new", "name_new"]]
+    upserts = upserts.astype(object).where(upserts.notna(), None)
+    diff = MasterDiff(added=int(added.sum()), removed=int(removed.sum()), reassigned=int(rep_changed.sum()),
+                      industry_changed=int(ind_changed.sum()), changes=changes)
+    return diff, upserts, both.loc[removed, "acct_key"].tolist()
@@ -0,0 +1,747 @@
+# pipeline.py — Web Activity + Master merge pipeline, independent of the Streamlit UI
+# ---------------------------------------------------------------------
+# Stages: read -> normalize keys [-> de-duplicate] -> master join -> classify -> template -> assign/split
+# -> filter -> export. Each stage is a plain function of its inputs; StageRunner memoizes
+# stage results against a fingerprint of their declared inputs (settings, file hashes and
+# upstream fingerprints) so only stages whose inputs changed are recomputed.
+# run_batch() drives the same stages headlessly, streaming CSV activity in chunks.
+# In delta mode, classify + template run only for rows missing from a DeltaStore.
+
+import hashlib
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from cache import file_hash
+from classify import INDUSTRY_MATCHER, PRODUCT_MATCHER, clean_text
+from delta_store import STORED_COLS, DeltaCounts, DeltaStore, batch_id, row_fingerprints
+from diagnostics import active, count_rows, step
+from emails import PARALLEL_MIN_KEYS, generate_emails
+from exports import partition_stems
+from fuzzy import FuzzyIndex
+from jobs import report
+from master_index import as_db_text
+
+SOURCES = ["Known", "Unknown", "Intent"]
+DERIVED_COLS = ["Product Solution", "Subject Line", "Email Body"]
+FUZZY_COLS = ["Match Score", "Matched Master Account"]
+# compact: object columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+REP_OUTPUT = "rep_accounts.csv"
+UNASSIGNED_OUTPUT = "unassigned_web_activity.csv"
+PARTITION_MODES = ["none", "rep", "fragment"]
+EXCEL_ENGINES = ["openpyxl", "calamine"]
+READ_MODES = ["threads", "processes", "sequential"]
+DELTA_OUTPUTS = ["full", "delta"]
+# De-duplication: key fields, and which source's copy of a duplicate is kept
+DEDUP_FIELDS = ["account", "contact", "details"]
+DEDUP_PRECEDENCE = ["Known", "Intent", "Unknown"]
+PARTITION_DIR = "rep_accounts_partitions"
+MANIFEST_NAME = "manifest.csv"
+
+@dataclass(frozen=True)
+class Settings:
+    # Mirrors the Streamlit sidebar
+    col_account: str = "Account Name"
+    col_details: str = "Details"
+    col_first: str = "First Name"
+    col_last: str = "Last Name"
+    col_title: str = "Title"
+    master_account_col: str = "Account Name"
+    master_rep_col: str = "Current Team - Primary"
+    master_ind_col: str = "Industry (SF)"
+    rep_frags: str = ""
+    normalize_names: bool = True
+    hash_mode: str = "sha256"
+    fuzzy: bool = False
+    fuzzy_threshold: float = 0.85
+    compact: bool = False
+    excel_engine: str = "openpyxl"
+    workers: int = 1
+    parallel_min_keys: int = PARALLEL_MIN_KEYS
+    dedup: bool = False
+    dedup_fields: Tuple[str, ...] = tuple(DEDUP_FIELDS)
+
+    def out_cols(self) -> List[str]:
+        cols = output_columns(self.master_rep_col, self.col_account, self.col_first, self.col_last,
+                              self.col_title, self.col_details)
+        return cols + FUZZY_COLS if self.fuzzy else cols
+
+    def blank_cols(self) -> List[str]:
+        return [self.col_first, self.col_last, self.col_title]
+
+    def activity_usecols(self) -> Optional[List[str]]:
+        # Columns parsed from the activity files in compact mode (None = all)
+        if not self.compact:
+            return None
+        return [self.col_account, self.col_details, self.col_first, self.col_last, self.col_title]
+
+    def master_usecols(self) -> Optional[List[str]]:
+        if not self.compact:
+            return None
+        return [self.master_account_col, self.master_rep_col, self.master_ind_col]
+
+# -----------------------------
+# Reading
+# -----------------------------
+def _column_filter(usecols: Optional[Sequence[str]]) -> Optional[Callable[[str], bool]]:
+    # A callable rather than a list, so mapped columns missing from a file are skipped
+    # instead of failing the parse (the required-column checks report them)
+    if usecols is None:
+        return None
+    wanted = set(usecols)
+    return lambda c: c in wanted
+
+def excel_engine(preferred: str) -> str:
+    # calamine (python-calamine, Rust) only when requested and installed; openpyxl otherwise
+    if preferred == "calamine" and importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return "openpyxl"
+
+def parse_table(source, name: str, usecols: Optional[Sequence[str]] = None, compact: bool = False,
+                engine: str = "openpyxl") -> Tuple[pd.DataFrame, str]:
+    # source: path or buffer; name decides the parser and fills "Origin File".
+    # Returns (frame, parser used): "csv", or the Excel engine after any fallback.
+    if name.lower().endswith(".csv"):
+        df, parser = pd.read_csv(source, usecols=_column_filter(usecols)), "csv"
+    else:
+        parser = excel_engine(engine)
+        try:
+            df = pd.read_excel(source, usecols=_column_filter(usecols), engine=parser)
+        except Exception:
+            if parser == "openpyxl":
+                raise
+            # Workbooks calamine cannot handle are retried with openpyxl
+            if hasattr(source, "seek"):
+                source.seek(0)
+            parser = "openpyxl"
+            df = pd.read_excel(source, usecols=_column_filter(usecols), engine=parser)
+    if compact:
+        compact_frame(df)
+        df["Origin File"] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), categories=[name])
+    else:
+        # Attach origin filename
+        df["Origin File"] = name
+    return df, parser
+
+def read_table(source, name: str, usecols: Optional[Sequence[str]] = None, compact: bool = False,
+               engine: str = "openpyxl") -> pd.DataFrame:
+    return parse_table(source, name, usecols, compact, engine)[0]
+
+def _timed_parse(source, name: str, usecols: Optional[Sequence[str]], compact: bool,
+                 engine: str) -> Tuple[pd.DataFrame, float, str]:
+    t0 = time.perf_counter()
+    df, parser = parse_table(source, name, usecols, compact, engine)
+    return df, round(time.perf_counter() - t0, 4), parser
+
+def read_tables(jobs: Sequence[Tuple[Any, str, Optional[Sequence[str]]]], compact: bool = False,
+                engine: str = "openpyxl", mode: str = "threads") -> List[Tuple[pd.DataFrame, float, str]]:
+    # Parses (source, name, usecols) jobs concurrently; returns (frame, seconds, parser) per job,
+    # in job order. Each file is parsed exactly as read_table would, so results match a
+    # sequential read. Threads overlap the C CSV parser; openpyxl holds the GIL, so
+    # workbook-heavy inputs gain more from processes (frames are pickled back).
+    if mode not in READ_MODES:
+        raise ValueError(f"unknown read mode: {mode}")
+    if mode == "sequential" or len(jobs) < 2:
+        return [_timed_parse(source, name, usecols, compact, engine) for source, name, usecols in jobs]
+    pool_cls = ThreadPoolExecutor if mode == "threads" else ProcessPoolExecutor
+    with pool_cls(max_workers=min(len(jobs), os.cpu_count() or 1)) as pool:
+        futures = [pool.submit(_timed_parse, source, name, usecols, compact, engine) for source, name, usecols in jobs]
+        return [f.result() for f in futures]
+
+def iter_table_chunks(path: str, chunksize: int, usecols: Optional[Sequence[str]] = None,
+                      engine: str = "openpyxl") -> Iterator[pd.DataFrame]:
+    # CSVs stream straight from disk; workbooks have to be parsed whole, then sliced
+    name = os.path.basename(path)
+    if name.lower().endswith(".csv"):
+        for chunk in pd.read_csv(path, chunksize=chunksize, usecols=_column_filter(usecols)):
+            chunk["Origin File"] = name
+            yield chunk
+    else:
+        df = read_table(path, name, usecols, engine=engine)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+def compact_frame(df: pd.DataFrame, skip: Sequence[str] = ()) -> pd.DataFrame:
+    # In place: low-cardinality object columns become categoricals (one copy of each distinct
+    # value plus small integer codes). Categories keep first-seen order; nothing downstream
+    # sorts on a categorical column.
+    for c in df.columns:
+        values = df[c]
+        if c in skip or values.dtype != object or not len(values):
+            continue
+        codes, uniques = pd.factorize(values)
+        if len(uniques) <= len(values) * CATEGORY_MAX_RATIO:
+            df[c] = pd.Categorical.from_codes(codes, categories=uniques)
+    return df
+
+def uncompacted_nbytes(df: pd.DataFrame) -> int:
+    # Deep memory the same frame would take with its categoricals stored as object columns
+    total = int(df.index.memory_usage(deep=True))
+    for c in df.columns:
+        values = df[c]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            values = values.astype(object)
+        total += int(values.memory_usage(index=False, deep=True))
+    return total
+
+def table_columns(path: str) -> List[str]:
+    name = os.path.basename(path)
+    if name.lower().endswith(".csv"):
+        cols = list(pd.read_csv(path, nrows=0).columns)
+    else:
+        cols = list(pd.read_excel(path, nrows=0).columns)
+    return cols + ["Origin File"]
+
+# -----------------------------
+# Stage runner
+# -----------------------------
+class StageRunner:
+    def __init__(self, store: MutableMapping[str, Tuple[str, Any]]):
+        # store maps stage name -> (fingerprint, result); pass st.session_state-backed dict to persist
+        self.store = store
+        self.fingerprints: Dict[str, str] = {}
+        self.recomputed: List[str] = []
+
+    def _fingerprint(self, name: str, inputs: Tuple, upstream: Sequence[str]) -> str:
+        fp_src = repr((name, inputs, tuple(self.fingerprints[u] for u in upstream)))
+        return hashlib.blake2b(fp_src.encode("utf-8"), digest_size=16).hexdigest()
+
+    def is_current(self, name: str, inputs: Tuple, upstream: Sequence[str] = ()) -> bool:
+        # Whether run() would return a stored result without recomputing
+        cached = self.store.get(name)
+        return cached is not None and cached[0] == self._fingerprint(name, inputs, upstream)
+
+    def fork(self, store: MutableMapping[str, Tuple[str, Any]]) -> "StageRunner":
+        # A runner over another store (e.g. a background job's) that knows this runner's
+        # fingerprints, so stages run here can be named as upstream there
+        runner = StageRunner(store)
+        runner.fingerprints.update(self.fingerprints)
+        return runner
+
+    def declare(self, name: str, inputs: Tuple, upstream: Sequence[str] = ()) -> str:
+        # Fingerprints a stage that may only run later (e.g. on export), so downstream stages
+        # can already name it as upstream
+        fp = self._fingerprint(name, inputs, upstream)
+        self.fingerprints[name] = fp
+        return fp
+
+    def run(self, name: str, inputs: Tuple, fn: Callable[[], Any], upstream: Sequence[str] = ()) -> Any:
+        fp = self.declare(name, inputs, upstream)
+        cached = self.store.get(name)
+        if cached is not None and cached[0] == fp:
+            trace = active()
+            if trace is not None:
+                trace.cached(name, count_rows(cached[1]))
+            return cached[1]
+        # The first upstream is the stage's primary input (e.g. activity for join, not master)
+        rows_in = count_rows(self.store[upstream[0]][1]) if upstream else None
+        report(name, 0, rows_in or 0)
+        with step(name, rows_in) as rec:
+            result = fn()
+            rec["rows_out"] = count_rows(result)
+        self.store[name] = (fp, result)
+        self.recomputed.append(name)
+        return result
+
+    def result(self, name: str) -> Any:
+        return self.store[name][1]
+
+# -----------------------------
+# Stages
+# -----------------------------
+def normalize_keys(values: pd.Series, normalize_names: bool) -> pd.Series:
+    # Vectorized norm_account: trim, and optionally collapse whitespace + casefold
+    text = clean_text(values)
+    if not normalize_names:
+        return text
+    codes, uniques = pd.factorize(text)
+    uniques = pd.Series(uniques, dtype=object).str.replace(r"\s+", " ", regex=True).str.strip().str.casefold()
+    return pd.Series(uniques.to_numpy()[codes], index=values.index, dtype=object)
+
+def combine_activity(known: pd.DataFrame, unknown: pd.DataFrame, intent: pd.DataFrame,
+                     col_account: str, normalize_names: bool, compact: bool = False) -> pd.DataFrame:
+    frames = []
+    for source, df in zip(SOURCES, [known, unknown, intent]):
+        df = df.copy(deep=False)
+        df["__Source__"] = source
+        frames.append(df)
+    # Concat all activity, with First/Last/Title only in known (NaN elsewhere)
+    with step("concat sources"):
+        activity = pd.concat(frames, ignore_index=True, sort=False)
+    with step("account keys", len(activity)):
+        activity["__acct_key__"] = normalize_keys(activity[col_account], normalize_names)
+    if compact:
+        # concat turns categoricals with differing categories back into object columns
+        with step("compact columns", len(activity)):
+            compact_frame(activity)
+    return activity
+
+def dedup_hashes(activity: pd.DataFrame, fields: Sequence[str], col_first: str, col_last: str,
+                 col_title: str, col_details: str) -> np.ndarray:
+    # One 64-bit hash per row over the key fields: the normalized account key, and the trimmed,
+    # casefolded contact (first/last/title) and details. Each column is cleaned and hashed once
+    # per distinct value; missing columns count as blank.
+    columns = {"account": ["__acct_key__"], "contact": [col_first, col_last, col_title], "details": [col_details]}
+    parts = {}
+    for field in fields:
+        if field not in columns:
+            raise ValueError(f"unknown de-duplication field: {field}")
+        for c in columns[field]:
+            if c not in activity.columns or c in parts:
+                continue
+            codes, uniques = pd.factorize(activity[c])
+            cleaned = clean_text(pd.Series(uniques, dtype=object)).str.casefold()
+            hashed = pd.util.hash_array(np.append(cleaned.to_numpy(dtype=object), ""), categorize=False)
+            parts[c] = hashed[codes]  # code -1 (NaN) takes the trailing "" hash
+    if not parts:
+        return np.zeros(len(activity), dtype=np.uint64)
+    return pd.util.hash_pandas_object(pd.DataFrame(parts), index=False).to_numpy()
+
+def dedup_activity(activity: pd.DataFrame, fields: Sequence[str], col_first: str, col_last: str,
+                   col_title: str, col_details: str) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    # Drops rows whose key hash was already seen, keeping the copy from the first source in
+    # DEDUP_PRECEDENCE (then the first in input order). Linear: the precedence order is a stable
+    # sort of a 3-valued rank and duplicates are found with a hash table. Returns the remaining
+    # rows (input order) and the rows removed per source.
+    hashes = dedup_hashes(activity, fields, col_first, col_last, col_title, col_details)
+    source = activity["__Source__"].astype(object).to_numpy()
+    rank = pd.Series(source).map({s: i for i, s in enumerate(DEDUP_PRECEDENCE)}).to_numpy(dtype=np.int8)
+    order = np.argsort(rank, kind="stable")
+    keep = np.empty(len(activity), dtype=bool)
+    keep[order] = ~pd.Series(hashes[order]).duplicated().to_numpy()
+    removed = pd.Series(source[~keep]).value_counts()
+    counts = {s: int(removed.get(s, 0)) for s in SOURCES}
+    return activity[keep].reset_index(drop=True), counts
+
+def unseen_rows(hashes: np.ndarray, seen: set) -> np.ndarray:
+    # Streaming dedup_activity for chunks fed in precedence order: mask of rows whose hash is
+    # neither in seen nor earlier in the chunk; their hashes are added to seen
+    keep = ~pd.Series(hashes).duplicated().to_numpy()
+    keep &= np.fromiter((h not in seen for h in hashes.tolist()), dtype=bool, count=len(hashes))
+    seen.update(hashes[keep].tolist())
+    return keep
+
+def build_master_slim(master: pd.DataFrame, master_account_col: str, merge_cols: Sequence[str],
+                      normalize_names: bool) -> pd.DataFrame:
+    keyed = master[list(merge_cols)].copy()
+    keyed.insert(0, "__acct_key__", normalize_keys(master[master_account_col], normalize_names))
+    keyed["__master_name__"] = clean_text(master[master_account_col])
+    return keyed.drop_duplicates(subset="__acct_key__")
+
+def join_master(activity: pd.DataFrame, master_slim: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    # Left join on the (unique) master key, so unmatched rows get NaN rep/industry. The master
+    # columns are gathered onto a shallow copy: activity columns are shared, not copied.
+    out = activity.copy(deep=False)
+    lookup = master_slim.set_index("__acct_key__").reindex(activity["__acct_key__"].to_numpy())
+    for c in lookup.columns:
+        out[c] = lookup[c].array
+    if compact:
+        compact_frame(out, skip=activity.columns)
+    return out
+
+def build_fuzzy_index(master_slim: pd.DataFrame) -> FuzzyIndex:
+    return FuzzyIndex(master_slim["__acct_key__"].tolist())
+
+def fuzzy_join(merged: pd.DataFrame, master_slim: pd.DataFrame, index: FuzzyIndex,
+               threshold: float, compact: bool = False) -> Tuple[pd.DataFrame, int]:
+    # Second pass over rows that missed the exact join: each distinct unmatched key is looked
+    # up once in the blocking index and, above threshold, takes the master row's rep/industry.
+    # Index positions are master_slim row positions. Returns (frame, rows recovered).
+    out = merged.copy(deep=False)
+    exact = out["__acct_key__"].isin(master_slim["__acct_key__"]).to_numpy()
+    score = np.where(exact, 1.0, np.nan)
+    miss = np.flatnonzero(~exact)
+    hit_rows = miss[:0]
+    if len(miss):
+        codes, uniques = pd.factorize(out["__acct_key__"].to_numpy(dtype=object)[miss])
+        positions, scores = index.match(list(uniques), threshold)
+        row_pos = positions[codes]
+        found = row_pos >= 0
+        hit_rows = miss[found]
+        matched = master_slim.iloc[row_pos[found]]
+        for c in master_slim.columns.drop("__acct_key__"):
+            values = out[c].to_numpy(dtype=object, copy=True)
+            values[hit_rows] = matched[c].to_numpy(dtype=object)
+            out[c] = values
+        score[hit_rows] = scores[codes[found]]
+    if compact and len(hit_rows):
+        # The patched master columns came back as object
+        compact_frame(out, skip=[c for c in out.columns if c not in master_slim.columns])
+    out["Match Score"] = score.round(3)
+    out["Matched Master Account"] = out["__master_name__"]
+    return out, len(hit_rows)
+
+def classify_rows(merged: pd.DataFrame, col_details: str, master_ind_col: str, compact: bool = False) -> pd.DataFrame:
+    out = merged.copy(deep=False)
+    industry_src = out[master_ind_col] if master_ind_col in out.columns else pd.Series("", index=out.index)
+    with step("Product Solution", len(out)):
+        out["Product Solution"] = PRODUCT_MATCHER.match_series(out[col_details])
+    with step("Industry Norm", len(out)):
+        out["Industry Norm"] = INDUSTRY_MATCHER.match_series(industry_src)  # for internal use
+    if compact:
+        compact_frame(out, skip=merged.columns)
+    return out
+
+def template_rows(classified: pd.DataFrame, col_first: str, col_title: str, col_account: str,
+                  col_details: str, hash_mode: str = "sha256", compact: bool = False, workers: int = 1,
+                  parallel_min_keys: int = PARALLEL_MIN_KEYS) -> Tuple[pd.DataFrame, int]:
+    # workers / parallel_min_keys only change how the emails are rendered, never the result
+    out = classified.copy(deep=False)
+    blank = pd.Series("", index=out.index)
+    out["Subject Line"], out["Email Body"], n_keys = generate_emails(
+        out.get(col_first, blank),
+        out.get(col_title, blank),
+        out[col_account],
+        out["Product Solution"],
+        out[col_details],
+        out["Industry Norm"],
+        hash_mode=hash_mode,
+        compact=compact,
+        workers=workers,
+        parallel_min_keys=parallel_min_keys,
+    )
+    return out, n_keys
+
+def delta_rows(matched: pd.DataFrame, store: DeltaStore, batch: str, col_first: str, col_last: str,
+               col_title: str, col_account: str, col_details: str, master_ind_col: str,
+               hash_mode: str = "sha256", compact: bool = False, workers: int = 1,
+               parallel_min_keys: int = PARALLEL_MIN_KEYS) -> Tuple[pd.DataFrame, np.ndarray, DeltaCounts]:
+    # classify_rows + template_rows for delta mode: rows already in the store (same fingerprint,
+    # same master industry) take their stored derived columns, the rest are processed and
+    # recorded under batch. Returns (frame, mask of rows new to the store, counts).
+    fps = row_fingerprints(matched, ["__Source__", col_account, col_first, col_last, col_title, col_details])
+    industry = as_db_text(matched[master_ind_col]) if master_ind_col in matched.columns \
+        else pd.Series(None, index=matched.index, dtype=object)
+    with step("row store lookup", len(matched)):
+        found = store.lookup(fps, hash_mode).reindex(fps)
+    in_store = found["first_batch"].notna().to_numpy()
+    new = ~in_store | (found["first_batch"] == batch).to_numpy()
+    reuse = in_store & (found["industry"].fillna("\0").to_numpy() == industry.fillna("\0").to_numpy())
+    todo = np.flatnonzero(~reuse)
+    classified = classify_rows(matched.iloc[todo], col_details, master_ind_col)
+    templated, _ = template_rows(classified, col_first, col_title, col_account, col_details, hash_mode,
+                                 workers=workers, parallel_min_keys=parallel_min_keys)
+    out = matched.copy(deep=False)
+    for c in STORED_COLS:
+        values = found[c].to_numpy(dtype=object, copy=True)
+        values[todo] = templated[c].to_numpy(dtype=object)
+        out[c] = values
+    if compact:
+        compact_frame(out, skip=matched.columns)
+    with step("row store update", len(todo)):
+        rebuilt = store.record(batch, fps, fps[todo], industry.iloc[todo], templated, hash_mode)
+    counts = DeltaCounts(rows=len(out), new=int(new.sum()), reused=int(reuse.sum()), processed=len(todo),
+                         rebuilt=rebuilt)
+    return out, new, counts
+
+def assigned_mask(rep: pd.Series) -> np.ndarray:
+    # Assigned: rep not blank/NaN. Categoricals are tested once per category.
+    if isinstance(rep.dtype, pd.CategoricalDtype):
+        truth = np.array([bool(c) for c in rep.cat.categories] + [False], dtype=bool)
+        return truth[rep.cat.codes.to_numpy()]
+    return rep.fillna("").astype(bool).to_numpy()
+
+def split_positions(templated: pd.DataFrame, master_rep_col: str, col_account: str) -> Tuple[np.ndarray, np.ndarray]:
+    # Row positions of the assigned / unassigned rows, sorted by account (stable, so ties keep
+    # source order). Output frames are taken from these, so the full frame is never copied.
+    with step("sort by account", len(templated)):
+        # Sort on the values themselves; a categorical would sort in category order
+        account = pd.Series(np.asarray(templated[col_account], dtype=object))
+        order = account.sort_values(kind="stable").index.to_numpy()
+    with step("split assigned / unassigned", len(order)):
+        assigned = assigned_mask(templated[master_rep_col])[order]
+        return order[assigned], order[~assigned]
+
+def split_assigned(templated: pd.DataFrame, master_rep_col: str, col_account: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Frame form of split_positions, with the rep column blank-filled
+    parts = []
+    for positions in split_positions(templated, master_rep_col, col_account):
+        part = templated.take(positions)
+        part[master_rep_col] = fill_blank(part[master_rep_col])
+        parts.append(part)
+    return parts[0], parts[1]
+
+def parse_rep_frags(rep_frags: str) -> List[str]:
+    return [f.strip().lower() for f in rep_frags.split(",") if f.strip()]
+
+def fragment_matrix(rep: pd.Series, frags: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    # Case-insensitive partial match of every fragment against each distinct rep value.
+    # Returns (row codes, distinct values x fragments bool matrix); the matrix has an extra
+    # all-False last row, so code -1 (NaN) indexes to "no match".
+    codes, uniques = pd.factorize(rep)
+    lowered = pd.Series(uniques, dtype=object).astype(str).str.lower()
+    matrix = np.zeros((len(uniques) + 1, len(frags)), dtype=bool)
+    for j, f in enumerate(frags):
+        matrix[:-1, j] = lowered.str.contains(f, regex=False).to_numpy(dtype=bool)
+    return codes, matrix
+
+def _fragment_mask(rep: pd.Series, frags: Sequence[str]) -> np.ndarray:
+    # Rep fragments filter: rows whose rep contains any fragment
+    codes, matrix = fragment_matrix(rep, frags)
+    return matrix.any(axis=1)[codes]
+
+def filter_reps(with_rep: pd.DataFrame, master_rep_col: str, rep_frags: str) -> pd.DataFrame:
+    frags = parse_rep_frags(rep_frags)
+    if not frags:
+        return with_rep
+    return with_rep[_fragment_mask(with_rep[master_rep_col], frags)]
+
+def filter_positions(frame: pd.DataFrame, positions: np.ndarray, master_rep_col: str, rep_frags: str) -> np.ndarray:
+    # filter_reps over the assigned row positions from split_positions
+    frags = parse_rep_frags(rep_frags)
+    if not frags:
+        return positions
+    return positions[_fragment_mask(frame[master_rep_col].take(positions), frags)]
+
+def partition_positions(frame: pd.DataFrame, positions: np.ndarray, master_rep_col: str, by: str,
+                        frags: Sequence[str] = ()) -> List[Tuple[str, np.ndarray]]:
+    # Splits row positions into per-rep partitions in one pass: by "rep" (one partition per
+    # distinct rep value, ordered by name) or by "fragment" (one per fragment; a row whose rep
+    # matches several fragments is in each of them). Row order within a partition is kept.
+    rep = frame[master_rep_col].take(positions)
+    if by == "fragment":
+        codes, matrix = fragment_matrix(rep, frags)
+        return [(f, positions[matrix[codes, j]]) for j, f in enumerate(frags)]
+    if by != "rep":
+        raise ValueError(f"unknown partition mode: {by}")
+    codes, uniques = pd.factorize(rep)
+    keep = codes >= 0
+    codes, kept = codes[keep], positions[keep]
+    # Stable sort by code groups the rows while keeping their order inside each group
+    bounds = np.cumsum(np.bincount(codes, minlength=len(uniques)))[:-1]
+    groups = np.split(kept[np.argsort(codes, kind="stable")], bounds)
+    return sorted(((str(label), group) for label, group in zip(uniques, groups)), key=lambda p: p[0].casefold())
+
+def partition_manifest(frame: pd.DataFrame, partitions: Sequence[Tuple[str, np.ndarray]],
+                       files: Sequence[str]) -> pd.DataFrame:
+    keys = frame["__acct_key__"]
+    return pd.DataFrame({
+        "Partition": [label for label, _ in partitions],
+        "File": list(files),
+        "Rows": [len(pos) for _, pos in partitions],
+        "Accounts": [keys.take(pos).nunique() for _, pos in partitions],
+    })
+
+def output_columns(master_rep_col: str, col_account: str, col_first: str, col_last: str,
+                   col_title: str, col_details: str) -> List[str]:
+    # Current Team - Primary is master_rep_col, blanks where appropriate
+    return [master_rep_col, col_account, col_first, col_last, col_title, col_details,
+            *DERIVED_COLS, "Origin File"]
+
+def fill_blank(values: pd.Series) -> pd.Series:
+    # fillna("") that also works on categoricals ("" has to be a category first)
+    if isinstance(values.dtype, pd.CategoricalDtype) and "" not in values.cat.categories:
+        values = values.cat.add_categories("")
+    return values.fillna("")
+
+def select_output(frame: pd.DataFrame, out_cols: Sequence[str], blank_cols: Sequence[str]) -> pd.DataFrame:
+    # Filter to existing columns; contact columns (NaN for unknown/intent rows) become blanks
+    out = frame[[c for c in out_cols if c in frame.columns]].copy(deep=False)
+    for c in blank_cols:
+        if c in out.columns:
+            out[c] = fill_blank(out[c])
+    return out
+
+def take_output(frame: pd.DataFrame, positions: np.ndarray, out_cols: Sequence[str],
+                blank_cols: Sequence[str]) -> pd.DataFrame:
+    # select_output for the rows at positions; only the output columns are copied
+    cols = [c for c in out_cols if c in frame.columns]
+    out = frame.iloc[positions, frame.columns.get_indexer(cols)].copy(deep=False)
+    for c in blank_cols:
+        if c in out.columns:
+            out[c] = fill_blank(out[c])
+    return out
+
+def template_output(classified: pd.DataFrame, positions: np.ndarray, out_cols: Sequence[str],
+                    blank_cols: Sequence[str], col_first: str, col_title: str, col_account: str, col_details: str,
+                    hash_mode: str = "sha256", compact: bool = False, workers: int = 1,
+                    parallel_min_keys: int = PARALLEL_MIN_KEYS) -> pd.DataFrame:
+    # take_output for lazy email generation: Subject Line / Email Body are templated for the
+    # rows at positions only. Emails depend on their row alone, so the result equals
+    # take_output on a fully templated frame.
+    inputs = [col_first, col_title, col_account, col_details, "Product Solution", "Industry Norm"]
+    cols = [c for c in dict.fromkeys([*out_cols, *inputs]) if c in classified.columns]
+    rows = classified.iloc[positions, classified.columns.get_indexer(cols)].copy(deep=False)
+    templated, _ = template_rows(rows, col_first, col_title, col_account, col_details, hash_mode, compact,
+                                 workers, parallel_min_keys)
+    return take_output(templated, np.arange(len(templated)), out_cols, blank_cols)
+
+def to_csv_bytes(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode("utf-8")
+
+# -----------------------------
+# Headless batch run
+# -----------------------------
+def add_missing_columns(chunk: pd.DataFrame, cols: Sequence[str]) -> pd.DataFrame:
+    # Columns another activity file has but this one lacks, as NaN (as concatenating the files would)
+    absent = [c for c in cols if c not in chunk.columns]
+    if not absent:
+        return chunk
+    chunk = chunk.copy(deep=False)
+    for c in absent:
+        chunk[c] = np.nan
+    return chunk
+
+def process_chunk(chunk: pd.DataFrame, source: str, master_slim: pd.DataFrame, settings: Settings,
+                  fuzzy_index: Optional[FuzzyIndex] = None, delta_store: Optional[DeltaStore] = None,
+                  batch: str = "", delta_output: str = "full",
+                  seen: Optional[set] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # One activity chunk through normalize [-> dedup] -> join [-> fuzzy] -> classify -> template
+    # -> split -> filter. seen: key hashes of earlier chunks, when de-duplicating
+    s = settings
+    chunk = chunk.copy(deep=False)
+    chunk["__Source__"] = source
+    chunk["__acct_key__"] = normalize_keys(chunk[s.col_account], s.normalize_names)
+    if seen is not None:
+        hashes = dedup_hashes(chunk, s.dedup_fields, s.col_first, s.col_last, s.col_title, s.col_details)
+        chunk = chunk[unseen_rows(hashes, seen)]
+    merged = join_master(chunk, master_slim)
+    if fuzzy_index is not None:
+        merged, _ = fuzzy_join(merged, master_slim, fuzzy_index, s.fuzzy_threshold)
+    if delta_store is not None:
+        templated, new, _ = delta_rows(merged, delta_store, batch, s.col_first, s.col_last, s.col_title,
+                                       s.col_account, s.col_details, s.master_ind_col, s.hash_mode,
+                                       workers=s.workers, parallel_min_keys=s.parallel_min_keys)
+        if delta_output == "delta":
+            templated = templated.iloc[np.flatnonzero(new)]
+    else:
+        classified = classify_rows(merged, s.col_details, s.master_ind_col)
+        templated, _ = template_rows(classified, s.col_first, s.col_title, s.col_account, s.col_details,
+                                     s.hash_mode, workers=s.workers, parallel_min_keys=s.parallel_min_keys)
+    with_rep, without_rep = split_assigned(templated, s.master_rep_col, s.col_account)
+    return filter_reps(with_rep, s.master_rep_col, s.rep_frags), without_rep
+
+def load_master_slim(master_path: str, settings: Settings) -> pd.DataFrame:
+    s = settings
+    master = read_table(master_path, os.path.basename(master_path), s.master_usecols(), engine=s.excel_engine)
+    missing = [c for c in [s.master_account_col, s.master_rep_col] if c not in master.columns]
+    if missing:
+        raise ValueError(f"Master file missing required column(s): {', '.join(missing)}")
+    merge_cols = [s.master_rep_col]
+    if s.master_ind_col in master.columns:
+        merge_cols.append(s.master_ind_col)
+    return build_master_slim(master, s.master_account_col, merge_cols, s.normalize_names)
+
+class PartitionWriter:
+    # Appends per-rep (or per-fragment) CSVs chunk by chunk and tracks the manifest counts
+    def __init__(self, out_dir: str, cols: Sequence[str], labels: Sequence[str] = ()):
+        self.out_dir = out_dir
+        self.cols = list(cols)
+        self.files: Dict[str, str] = {}
+        self.rows: Dict[str, int] = {}
+        self.accounts: Dict[str, set] = {}
+        os.makedirs(out_dir, exist_ok=True)
+        for label in labels:
+            self._open(label)
+
+    def _open(self, label: str) -> str:
+        if label not in self.files:
+            stem = partition_stems([*self.files.values(), label])[-1]
+            self.files[label] = stem
+            self.rows[label] = 0
+            self.accounts[label] = set()
+            pd.DataFrame(columns=self.cols).to_csv(self._path(label), index=False)
+        return self._path(label)
+
+    def _path(self, label: str) -> str:
+        return os.path.join(self.out_dir, self.files[label] + ".csv")
+
+    def write(self, label: str, frame: pd.DataFrame, out: pd.DataFrame) -> None:
+        # frame: the partition's pipeline rows (for account keys); out: its output columns
+        out.to_csv(self._open(label), mode="a", header=False, index=False)
+        self.rows[label] += len(out)
+        self.accounts[label].update(frame["__acct_key__"].unique())
+
+    def write_manifest(self) -> pd.DataFrame:
+        labels = sorted(self.files, key=str.casefold)
+        manifest = pd.DataFrame({
+            "Partition": labels,
+            "File": [self.files[label] + ".csv" for label in labels],
+            "Rows": [self.rows[label] for label in labels],
+            "Accounts": [len(self.accounts[label]) for label in labels],
+        })
+        manifest.to_csv(os.path.join(self.out_dir, MANIFEST_NAME), index=False)
+        return manifest
+
+def run_batch(known: str, unknown: str, intent: str, master: Optional[str], out_dir: str,
+              settings: Optional[Settings] = None, chunksize: int = 100_000,
+              master_slim: Optional[pd.DataFrame] = None, partition_by: str = "none",
+              delta_store: Optional[DeltaStore] = None, delta_output: str = "full") -> Dict[str, int]:
+    # Peak memory is the master lookup plus one chunk. Rows are written in input order,
+    # sorted by account within each chunk only. Pass master_slim (e.g. from a MasterIndex)
+    # to skip reading the master file. partition_by "rep" / "fragment" additionally writes the
+    # Rep Accounts rows as one CSV per rep / fragment, with a manifest, under PARTITION_DIR.
+    # With delta_store, only rows missing from it are classified and templated; delta_output
+    # "delta" writes just the rows new to the store instead of all rows. With settings.dedup,
+    # sources are read in DEDUP_PRECEDENCE order and duplicates of earlier rows are dropped.
+    s = settings or Settings()
+    paths = dict(zip(SOURCES, [known, unknown, intent]))
+    header_cols = set()
+    for path in paths.values():
+        header_cols.update(table_columns(path))
+    missing = [c for c in [s.col_account, s.col_details] if c not in header_cols]
+    if missing:
+        raise ValueError(f"Activity file(s) missing required column(s): {', '.join(missing)}")
+    # Required columns only have to be in one of the files; the others get them blank
+    mapped = [c for c in dict.fromkeys([s.col_account, s.col_details, s.col_first, s.col_last, s.col_title])
+              if c in header_cols]
+
+    if master_slim is None:
+        master_slim = load_master_slim(master, s)
+    fuzzy_index = build_fuzzy_index(master_slim) if s.fuzzy else None
+    present = header_cols | set(master_slim.columns) | set(DERIVED_COLS) | set(FUZZY_COLS)
+    cols = [c for c in s.out_cols() if c in present]
+
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = {REP_OUTPUT: os.path.join(out_dir, REP_OUTPUT),
+               UNASSIGNED_OUTPUT: os.path.join(out_dir, UNASSIGNED_OUTPUT)}
+    counts = {"rows": 0, REP_OUTPUT: 0, UNASSIGNED_OUTPUT: 0}
+    for path in outputs.values():
+        pd.DataFrame(columns=cols).to_csv(path, index=False)
+    frags = parse_rep_frags(s.rep_frags)
+    partitions = None
+    if partition_by != "none":
+        if partition_by not in PARTITION_MODES:
+            raise ValueError(f"unknown partition mode: {partition_by}")
+        partitions = PartitionWriter(os.path.join(out_dir, PARTITION_DIR), cols,
+                                     frags if partition_by == "fragment" else ())
+
+    batch = ""
+    if delta_store is not None:
+        if delta_output not in DELTA_OUTPUTS:
+            raise ValueError(f"unknown delta output: {delta_output}")
+        batch = batch_id([file_hash(path) for path in paths.values()])
+
+    seen = None
+    if s.dedup:
+        paths = {source: paths[source] for source in DEDUP_PRECEDENCE}
+        seen = set()  # key hashes kept so far, across sources and chunks
+
+    for source, path in paths.items():
+        for chunk in iter_table_chunks(path, chunksize, s.activity_usecols(), s.excel_engine):
+            chunk = add_missing_columns(chunk, mapped)
+            counts["rows"] += len(chunk)
+            kept = len(seen) if seen is not None else 0
+            parts = process_chunk(chunk, source, master_slim, s, fuzzy_index, delta_store, batch, delta_output, seen)
+            if seen is not None:
+                key = f"duplicates {source}"
+                counts[key] = counts.get(key, 0) + len(chunk) - (len(seen) - kept)
+            for name, part in zip([REP_OUTPUT, UNASSIGNED_OUTPUT], parts):
+                out = select_output(part, cols, s.blank_cols()).reindex(columns=cols, fill_value="")
+                out.to_csv(outputs[name], mode="a", header=False, index=False)
+                counts[name] += len(out)
+                if name == REP_OUTPUT and partitions is not None:
+                    for label, pos in partition_positions(part, np.arange(len(part)), s.master_rep_col,
+                                                          partition_by, frags):
+                        partitions.write(label, part.iloc[pos], out.iloc[pos])
+    if partitions is not None:
+        counts[PARTITION_DIR] = len(partitions.write_manifest())
+    return counts
+
@@ -0,0 +1,220 @@
+# tests/test_classify.py — Pinned labels for the product, industry and role rule tables
+# ---------------------------------------------------------------------
+# Expected labels are those of the original if/elif classifiers, substring quirks included
+# (rules match anywhere in the lower-cased text). Each case is checked through both
+# RuleMatcher.match and RuleMatcher.match_series.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from classify import (INDUSTRY_MATCHER, PRODUCT_MATCHER, ROLE_MATCHER, norm_industry, product_from_details,
+                      role_category)
+
+EMPTY = ["", "   ", None, np.nan]
+
+PRODUCT_CASES = [
+    # HxGN EAM/APM, one case per keyword
+    ("https://hexagon.com/products/hxgn-eam", "HxGN EAM/APM"),
+    ("Asset Management overview", "HxGN EAM/APM"),
+    ("HxGN EAM", "HxGN EAM/APM"),
+    ("https://hexagon.com/solutions/enterprise-asset-management", "HxGN EAM/APM"),
+    ("maintenance", "HxGN EAM/APM"),
+    ("Equipment Management", "HxGN EAM/APM"),
+    ("https://hexagon.com/solutions/preventative-maintenance", "HxGN EAM/APM"),
+    ("preventative maintenance", "HxGN EAM/APM"),
+    ("asset data", "HxGN EAM/APM"),
+    ("steam turbines", "HxGN EAM/APM"),  # "eam" inside a word
+    # HxGN APM
+    ("https://hexagon.com/products/asset-performance", "N/A"),  # hyphenated: no keyword
+    ("asset performance", "HxGN APM"),
+    ("https://hexagon.com/products/apm-overview", "HxGN APM"),
+    # ETQ
+    ("https://hexagon.com/solutions/quality-compliance", "ETQ"),
+    ("https://hexagon.com/products/etq-reliance-qms", "ETQ"),
+    ("QMS", "ETQ"),
+    ("compliance", "ETQ"),
+    # Ecosys
+    ("https://hexagon.com/solutions/project-management/ecosys", "Ecosys"),
+    ("https://hexagon.com/products/project-controls", "Ecosys"),
+    ("ecosys", "Ecosys"),
+    # Scanner / CADWorx / CAESAR II
+    ("https://hexagon.com/products/coordinate-measuring-machines", "Scanner"),
+    ("https://hexagon.com/products/cadworx-plant", "CADWorx"),
+    ("https://hexagon.com/products/caesar-ii", "CAESAR II"),
+    # J5/AKMS / AKMS
+    ("https://hexagon.com/solutions/productivity-and-efficiency", "J5/AKMS"),
+    ("Webinar: Digital Transformation in Operations", "J5/AKMS"),
+    ("https://hexagon.com/products/acceleratorkms", "AKMS"),
+    # No rule
+    ("https://hexagon.com/company/careers", "N/A"),
+    ("https://hexagon.com/", "N/A"),
+    # Priority collisions: the earlier rule wins
+    ("eam quality", "HxGN EAM/APM"),
+    ("https://hexagon.com/products/hxgn-eam?ref=quality", "HxGN EAM/APM"),
+    ("asset performance maintenance", "HxGN EAM/APM"),
+    ("apm compliance", "HxGN APM"),
+    ("quality controls", "ETQ"),
+    ("project controls with cadworx", "Ecosys"),
+    ("cadworx and caesar", "CADWorx"),
+    ("acceleratorkms digital transformation", "J5/AKMS"),
+    ("  HXGN-EAM  ", "HxGN EAM/APM"),
+] + [(v, "N/A") for v in EMPTY]
+
+INDUSTRY_CASES = [
+    ("Aerospace", "aerospace"),
+    ("Defense", "aerospace"),
+    ("Automotive", "automotive"),
+    ("Commercial Vehicles", "automotive"),
+    ("Mobility", "automotive"),
+    ("Oil", "energy"),
+    ("Natural Gas", "energy"),
+    ("O&G", "energy"),
+    ("Energy", "energy"),
+    ("Upstream", "energy"),
+    ("Midstream", "energy"),
+    ("Downstream", "energy"),
+    ("Refining", "energy"),
+    ("Life Sciences", "lifesciences"),
+    ("Pharmaceuticals", "lifesciences"),
+    ("Biotech", "lifesciences"),
+    ("Medical Devices", "lifesciences"),
+    ("Food", "foodbev"),
+    ("Beverage", "foodbev"),
+    ("F&B", "foodbev"),
+    ("Chemicals", "chemicals"),
+    ("Petrochemicals", "chemicals"),
+    ("Utilities", "utilities"),
+    ("Power", "utilities"),
+    ("Generation", "utilities"),
+    ("Transmission", "utilities"),
+    ("Distribution", "utilities"),
+    ("Mining", "mining"),
+    ("Metals", "mining"),
+    ("Electronics", "hitech"),
+    ("Semiconductor", "hitech"),
+    ("High-Tech", "hitech"),
+    ("Hi Tech", "hitech"),
+    ("HiTech", "hitech"),
+    ("Discrete Manufacturing", "discrete"),
+    ("Industrial Machinery", "discrete"),
+    ("Heavy Equipment", "discrete"),
+    ("Industrial", "discrete"),
+    ("Retail", "other"),
+    ("Logistics", "other"),
+    # Priority collisions
+    ("Aerospace & Defense Automotive", "aerospace"),
+    ("Oil & Gas", "energy"),
+    ("Automotive Energy", "automotive"),
+    ("Petrochemical Refining", "energy"),
+    ("Food & Beverage Chemicals", "foodbev"),
+    ("Power & Mining", "utilities"),
+    ("Mining & Metals", "mining"),
+    ("Industrial Electronics", "hitech"),
+    ("Medical Electronics", "lifesciences"),
+] + [(v, "discrete") for v in EMPTY]  # an empty industry counts as discrete, unlike "other"
+
+ROLE_CASES = [
+    # exec
+    ("Chief Operating Officer", "exec"),
+    ("CXO", "exec"),
+    ("CEO", "exec"),
+    ("CFO", "exec"),
+    ("COO", "exec"),
+    ("CIO", "exec"),
+    ("CTO", "exec"),
+    ("CISO", "exec"),
+    ("President", "exec"),
+    ("SVP Operations", "exec"),
+    ("EVP Sales", "exec"),
+    ("Vice President, Engineering", "exec"),  # "president"
+    ("Director of Quality", "exec"),  # "cto" inside "director"
+    ("EHS Coordinator", "exec"),  # "coo" inside "coordinator"
+    ("Chief", "ic"),  # "chief " needs the trailing space, lost to strip()
+    # vp
+    ("VP Maintenance", "vp"),
+    ("vp", "vp"),
+    # quality
+    ("Quality Engineer", "quality"),
+    ("Compliance Manager", "quality"),
+    ("QMS Specialist", "quality"),
+    ("Regulatory Affairs", "quality"),
+    # maintenance
+    ("Maintenance Planner", "maintenance"),
+    ("Reliability Engineer", "maintenance"),
+    ("Asset Manager", "maintenance"),
+    ("Condition Monitoring Analyst", "maintenance"),
+    # projects
+    ("Project Controls Lead", "projects"),
+    ("Senior Project Manager", "projects"),
+    ("Program Manager", "projects"),
+    ("PMO Analyst", "projects"),
+    # operations
+    ("Operations Analyst", "operations"),
+    ("Manufacturing Engineer", "operations"),
+    ("Plant Manager", "operations"),
+    ("Production Supervisor", "operations"),
+    # engineering
+    ("Engineering Specialist", "engineering"),
+    ("Design Engineer", "engineering"),
+    ("CAD Technician", "engineering"),
+    ("Piping Designer", "engineering"),
+    # safety
+    ("EHS Specialist", "safety"),
+    ("HSE Advisor", "safety"),
+    ("Safety Manager", "safety"),
+    # it
+    ("IT Manager", "it"),
+    ("OT Architect", "it"),
+    ("Information Technology Specialist", "it"),
+    ("Industrial IT", "it"),
+    ("Systems Analyst", "it"),
+    ("Data Analyst", "it"),
+    ("IT", "ic"),  # "it " needs a following word
+    # manager
+    ("Office Manager", "manager"),
+    ("Team Lead", "manager"),
+    ("Head of Sales", "manager"),
+    # ic
+    ("Buyer", "ic"),
+    ("Analyst", "ic"),
+    # Priority collisions
+    ("VP / Director", "exec"),
+    ("VP Quality", "vp"),
+    ("Quality Maintenance Manager", "quality"),
+    ("Maintenance Engineering Lead", "maintenance"),
+    ("Project Manager, Operations", "projects"),
+    ("Manufacturing Systems Engineer", "operations"),
+    ("Safety Data Lead", "safety"),
+] + [(v, "ic") for v in EMPTY]
+
+MATCHERS = [
+    (PRODUCT_MATCHER, product_from_details, PRODUCT_CASES),
+    (INDUSTRY_MATCHER, norm_industry, INDUSTRY_CASES),
+    (ROLE_MATCHER, role_category, ROLE_CASES),
+]
+MATCH_CASES = [(matcher, fn, text, label) for matcher, fn, cases in MATCHERS for text, label in cases]
+
+@pytest.mark.parametrize("matcher, fn, text, expected", MATCH_CASES)
+def test_match(matcher, fn, text, expected):
+    assert matcher.match(text) == expected
+    assert fn(text) == expected
+
+@pytest.mark.parametrize("matcher, fn, cases", MATCHERS)
+def test_match_series(matcher, fn, cases):
+    texts = [text for text, _ in cases]
+    values = pd.Series(texts + texts[::-1], index=np.arange(2 * len(texts)) * 3, dtype=object)
+    labels = matcher.match_series(values)
+    expected = [label for _, label in cases]
+    assert labels.tolist() == expected + expected[::-1]
+    assert labels.index.equals(values.index)
+
+@pytest.mark.parametrize("matcher, fn, cases", MATCHERS)
+def test_match_series_categorical(matcher, fn, cases):
+    # Compact mode hands the matchers categorical columns
+    texts = [text for text, _ in cases]
+    labels = matcher.match_series(pd.Series(pd.Categorical(texts)))
+    assert labels.tolist() == [label for _, label in cases]
+
+def test_match_series_empty():
+    assert PRODUCT_MATCHER.match_series(pd.Series([], dtype=object)).tolist() == []
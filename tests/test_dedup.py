@@ -0,0 +1,116 @@
+# tests/test_dedup.py — Cross-source de-duplication: key hashes, precedence, streaming
+# ---------------------------------------------------------------------
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline import (DEDUP_FIELDS, DEDUP_PRECEDENCE, SOURCES, Settings, dedup_activity, dedup_hashes, run_batch,
+                      unseen_rows)
+
+S = Settings()
+FIELDS = list(DEDUP_FIELDS)
+
+def activity(rows):
+    # (source, account key, first, last, title, details) per row, plus a row id
+    frame = pd.DataFrame(rows, columns=["__Source__", "__acct_key__", S.col_first, S.col_last, S.col_title,
+                                        S.col_details])
+    frame["id"] = np.arange(len(frame))
+    return frame
+
+def hashes(frame, fields=FIELDS):
+    return dedup_hashes(frame, fields, S.col_first, S.col_last, S.col_title, S.col_details)
+
+def dedup(frame, fields=FIELDS):
+    return dedup_activity(frame, fields, S.col_first, S.col_last, S.col_title, S.col_details)
+
+ROWS = [
+    ("Unknown", "acme 1", np.nan, np.nan, np.nan, "/eam"),     # 0: duplicate of 3 (Intent wins)
+    ("Known", "acme 1", "Ann", "Smith", "CIO", "/eam"),        # 1: kept
+    ("Known", "acme 1", " ann ", "SMITH", "cio", "/eam"),      # 2: duplicate of 1 (case / spacing)
+    ("Intent", "acme 1", np.nan, np.nan, np.nan, "/eam"),      # 3: kept
+    ("Unknown", "globex 2", np.nan, np.nan, np.nan, "/qms"),   # 4: kept
+    ("Unknown", "globex 2", "", "", "", "/qms"),               # 5: duplicate of 4 (blank == NaN)
+    ("Intent", "acme 1", "Ann", "Smith", "CIO", "/eam"),       # 6: duplicate of 1 (Known wins)
+    ("Known", "acme 1", "Ann", "Smith", "CIO", "/apm"),        # 7: kept (other details)
+]
+
+def test_hashes_normalize_text():
+    h = hashes(activity(ROWS))
+    assert h[1] == h[2] == h[6]
+    assert h[0] == h[3]
+    assert h[4] == h[5]
+    assert len({h[1], h[0], h[4], h[7]}) == 4
+
+def test_missing_columns_are_skipped():
+    # A frame without any contact columns de-duplicates on the remaining fields
+    frame = activity(ROWS)
+    no_contact = frame.drop(columns=[S.col_first, S.col_last, S.col_title])
+    assert (hashes(no_contact) == hashes(frame, ["account", "details"])).all()
+
+def test_unknown_field():
+    with pytest.raises(ValueError):
+        hashes(activity(ROWS), ["account", "email"])
+
+def test_precedence_and_input_order():
+    kept, removed = dedup(activity(ROWS))
+    assert kept["id"].tolist() == [1, 3, 4, 7]  # input order
+    assert removed == {"Known": 1, "Unknown": 2, "Intent": 1}
+    assert list(removed) == SOURCES
+    assert kept.index.tolist() == [0, 1, 2, 3]
+
+def test_precedence_beats_input_order():
+    rows = [("Unknown", "a", np.nan, np.nan, np.nan, "/x"), ("Intent", "a", np.nan, np.nan, np.nan, "/x"),
+            ("Known", "a", np.nan, np.nan, np.nan, "/x")]
+    kept, removed = dedup(activity(rows))
+    assert kept["__Source__"].tolist() == [DEDUP_PRECEDENCE[0]] == ["Known"]
+    assert removed == {"Known": 0, "Unknown": 1, "Intent": 1}
+
+def test_field_subset():
+    kept, _ = dedup(activity(ROWS), ["account"])
+    assert kept["id"].tolist() == [1, 4]
+    kept, _ = dedup(activity(ROWS), ["account", "details"])
+    assert kept["id"].tolist() == [1, 4, 7]
+
+@pytest.mark.parametrize("fields", [FIELDS, ["account"], ["account", "details"], ["contact"]])
+@pytest.mark.parametrize("chunksize", [1, 2, 3, 100])
+def test_streaming_matches_dedup_activity(fields, chunksize):
+    # run_batch feeds chunks source by source in precedence order through unseen_rows
+    frame = activity(ROWS * 2)
+    h = hashes(frame, fields)
+    seen, kept_ids = set(), []
+    for source in DEDUP_PRECEDENCE:
+        pos = np.flatnonzero(frame["__Source__"].to_numpy() == source)
+        for start in range(0, len(pos), chunksize):
+            chunk = pos[start:start + chunksize]
+            kept_ids += frame["id"].to_numpy()[chunk[unseen_rows(h[chunk], seen)]].tolist()
+    kept, removed = dedup(frame, fields)
+    assert sorted(kept_ids) == kept["id"].tolist()
+    assert len(seen) == len(kept)
+    assert sum(removed.values()) == len(frame) - len(kept_ids)
+
+def test_unseen_rows_updates_seen():
+    seen = {5}
+    keep = unseen_rows(np.array([5, 7, 7, 9], dtype=np.uint64), seen)
+    assert keep.tolist() == [False, True, False, True]
+    assert seen == {5, 7, 9}
+
+def test_run_batch_dedup_matches_in_memory(tmp_path):
+    # Same activity, written as the three source files
+    columns = [S.col_account, S.col_first, S.col_last, S.col_title, S.col_details]
+    raw = pd.DataFrame([(src, acct.title(), *rest) for src, acct, *rest in ROWS * 2],
+                       columns=["__Source__", *columns])
+    paths = {}
+    for source in SOURCES:
+        paths[source] = str(tmp_path / f"{source}.csv")
+        raw[raw["__Source__"] == source][columns].to_csv(paths[source], index=False)
+    master = str(tmp_path / "master.csv")
+    pd.DataFrame({S.master_account_col: ["Acme 1"], S.master_rep_col: ["Alex Adams"],
+                  S.master_ind_col: ["Oil & Gas"]}).to_csv(master, index=False)
+    counts = run_batch(paths["Known"], paths["Unknown"], paths["Intent"], master, str(tmp_path / "out"),
+                       Settings(dedup=True), chunksize=2)
+    frame = activity(ROWS * 2)
+    kept, removed = dedup(frame)
+    assert {f"duplicates {s}": n for s, n in removed.items()} == {k: v for k, v in counts.items()
+                                                                  if k.startswith("duplicates")}
+    assert counts["rep_accounts.csv"] + counts["unassigned_web_activity.csv"] == len(kept)
@@ -0,0 +1,143 @@
+# tests/test_delta_store.py — Incremental runs: SQLite row store and delta_rows
+# ---------------------------------------------------------------------
+
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from delta_store import STORED_COLS, DeltaStore, batch_id, row_fingerprints
+from pipeline import Settings, classify_rows, delta_rows, template_rows
+
+S = Settings()
+FP_COLS = ["__Source__", S.col_account, S.col_first, S.col_last, S.col_title, S.col_details]
+
+def matched(rows, industry=None):
+    # A joined activity frame: (source, account, first, title, details) per row
+    frame = pd.DataFrame(rows, columns=["__Source__", S.col_account, S.col_first, S.col_title, S.col_details])
+    frame[S.col_last] = np.nan
+    frame["__acct_key__"] = frame[S.col_account].str.casefold()
+    frame[S.master_ind_col] = industry if industry is not None else "Oil & Gas"
+    frame[S.master_rep_col] = "Alex Adams"
+    return frame
+
+ROWS = [
+    ("Known", "Acme 1 Corp", "ann", "Maintenance Manager", "https://hexagon.com/products/hxgn-eam"),
+    ("Known", "Globex 2 Inc", "bob", "Quality Engineer", "https://hexagon.com/products/etq-reliance-qms"),
+    ("Unknown", "Initech 3", np.nan, np.nan, "https://hexagon.com/products/cadworx-plant"),
+]
+EXTRA = ("Intent", "Hooli 4", np.nan, np.nan, "https://hexagon.com/products/caesar-ii")
+
+def run(store, frame, batch, hash_mode="sha256"):
+    return delta_rows(frame, store, batch, S.col_first, S.col_last, S.col_title, S.col_account, S.col_details,
+                      S.master_ind_col, hash_mode)
+
+def expected(frame, hash_mode="sha256"):
+    classified = classify_rows(frame, S.col_details, S.master_ind_col)
+    templated, _ = template_rows(classified, S.col_first, S.col_title, S.col_account, S.col_details, hash_mode)
+    return templated[STORED_COLS].reset_index(drop=True)
+
+def stored(store, frame):
+    # Stored rows in frame order
+    fps = row_fingerprints(frame, FP_COLS)
+    return store.lookup(fps, "sha256").reindex(fps)
+
+def test_row_fingerprints():
+    frame = matched(ROWS)
+    fps = row_fingerprints(frame, FP_COLS)
+    assert fps.dtype == np.int64 and len(set(fps.tolist())) == len(ROWS)
+    # Compact (categorical) columns and a column missing altogether hash like NaN object values
+    compact = frame.astype({S.col_account: "category", S.col_details: "category"})
+    assert (row_fingerprints(compact, FP_COLS) == fps).all()
+    assert (row_fingerprints(frame.drop(columns=[S.col_last]), FP_COLS) == fps).all()
+    assert (row_fingerprints(frame.assign(**{S.col_first: "x"}), FP_COLS) != fps).any()
+
+def test_first_run_processes_everything(tmp_path):
+    store = DeltaStore(str(tmp_path / "rows.sqlite"))
+    frame = matched(ROWS)
+    out, new, counts = run(store, frame, "b1")
+    assert new.tolist() == [True] * 3
+    assert (counts.rows, counts.new, counts.reused, counts.processed, counts.rebuilt) == (3, 3, 0, 3, True)
+    pd.testing.assert_frame_equal(out[STORED_COLS].reset_index(drop=True), expected(frame))
+    meta = store.meta()
+    assert (meta["schema"], meta["hash_mode"], meta["last_batch"], meta["rows"]) == ("1", "sha256", "b1", "3")
+
+def test_rerun_of_same_batch_reuses_rows_but_keeps_them_new(tmp_path):
+    store = DeltaStore(str(tmp_path / "rows.sqlite"))
+    frame = matched(ROWS)
+    first, _, _ = run(store, frame, "b1")
+    out, new, counts = run(store, frame, "b1")
+    assert new.tolist() == [True] * 3  # first stored by this batch, so the delta is stable
+    assert (counts.new, counts.reused, counts.processed, counts.rebuilt) == (3, 3, 0, False)
+    pd.testing.assert_frame_equal(out[STORED_COLS], first[STORED_COLS])
+
+def test_later_batch_only_processes_new_rows(tmp_path):
+    store = DeltaStore(str(tmp_path / "rows.sqlite"))
+    run(store, matched(ROWS), "b1")
+    frame = matched(ROWS[1:] + [EXTRA])
+    out, new, counts = run(store, frame, "b2")
+    assert new.tolist() == [False, False, True]
+    assert (counts.new, counts.reused, counts.processed) == (1, 2, 1)
+    pd.testing.assert_frame_equal(out[STORED_COLS].reset_index(drop=True), expected(frame))
+    # Rows keep the batch that first stored them
+    assert stored(store, frame)["first_batch"].tolist() == ["b1", "b1", "b2"]
+    assert store.meta()["rows"] == "4"
+
+def test_industry_change_reprocesses_row(tmp_path):
+    store = DeltaStore(str(tmp_path / "rows.sqlite"))
+    run(store, matched(ROWS), "b1")
+    frame = matched(ROWS, industry=["Oil & Gas", "Life Sciences", "Oil & Gas"])
+    out, new, counts = run(store, frame, "b2")
+    assert new.tolist() == [False] * 3  # changed rows are reprocessed, not new
+    assert (counts.new, counts.reused, counts.processed) == (0, 2, 1)
+    assert out["Industry Norm"].tolist() == ["energy", "lifesciences", "energy"]
+    pd.testing.assert_frame_equal(out[STORED_COLS].reset_index(drop=True), expected(frame))
+    found = stored(store, frame)
+    assert found["industry"].tolist() == ["Oil & Gas", "Life Sciences", "Oil & Gas"]
+    assert found["first_batch"].tolist() == ["b1"] * 3
+
+def test_missing_industry_is_stored_as_null(tmp_path):
+    store = DeltaStore(str(tmp_path / "rows.sqlite"))
+    frame = matched(ROWS, industry=[np.nan, "", "Retail"])
+    run(store, frame, "b1")
+    assert stored(store, frame)["industry"].tolist() == [None, "", "Retail"]
+    _, _, counts = run(store, frame, "b2")
+    assert counts.reused == 3
+
+def test_hash_mode_change_rebuilds_store(tmp_path):
+    store = DeltaStore(str(tmp_path / "rows.sqlite"))
+    run(store, matched(ROWS), "b1")
+    assert store.matches("sha256") and not store.matches("fast")
+    frame = matched([EXTRA])
+    out, new, counts = run(store, frame, "b2", hash_mode="fast")
+    assert new.tolist() == [True]
+    assert (counts.new, counts.reused, counts.processed, counts.rebuilt) == (1, 0, 1, True)
+    pd.testing.assert_frame_equal(out[STORED_COLS].reset_index(drop=True), expected(frame, "fast"))
+    assert store.matches("fast") and store.meta()["rows"] == "1"
+    # The earlier rows went with the old hash mode
+    _, _, counts = run(store, matched(ROWS), "b3", hash_mode="fast")
+    assert (counts.reused, counts.processed) == (0, 3)
+
+def test_rows_not_seen_within_retention_are_pruned(tmp_path):
+    path = str(tmp_path / "rows.sqlite")
+    store = DeltaStore(path)
+    run(store, matched(ROWS), "b1")
+    con = sqlite3.connect(path)
+    with con:
+        con.execute("UPDATE rows SET last_seen = '2000-01-01'")
+    con.close()
+    run(store, matched(ROWS[:1]), "b2")  # refreshes only the first row
+    assert store.meta()["rows"] == "1"
+
+def test_batch_id_depends_on_content_order():
+    assert batch_id(["a", "b"]) == batch_id(["a", "b"])
+    assert batch_id(["a", "b"]) != batch_id(["b", "a"])
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_compact_output_matches(tmp_path, compact):
+    store = DeltaStore(str(tmp_path / "rows.sqlite"))
+    frame = matched(ROWS)
+    out, _, _ = delta_rows(frame, store, "b1", S.col_first, S.col_last, S.col_title, S.col_account,
+                           S.col_details, S.master_ind_col, compact=compact)
+    assert out[STORED_COLS].astype(object).reset_index(drop=True).equals(expected(frame).astype(object))
@@ -0,0 +1,157 @@
+# tests/test_emails.py — sha256 variant picks and rendered emails pinned to the original output
+# ---------------------------------------------------------------------
+# hash_mode="sha256" must keep picking the variants the original per-row templating picked:
+# index = int(sha256(key).hexdigest()[:8], 16) % n. The expected strings below were rendered
+# by the original subject_line / build_email_body. Cancelling a background job must also
+# stop parallel rendering promptly.
+
+import hashlib
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import emails
+from emails import (BODY_PICK_SUFFIXES, _render_rows, body_pick_table, build_email_body, deterministic_pick,
+                    generate_emails, stable_hashes, subject_line)
+from jobs import Job, JobCancelled, _current
+
+def original_pick(key: str, n: int) -> int:
+    if n <= 0: return 0
+    return int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:8], 16) % n
+
+KEYS = ["Acme 54 Corp", "Acme 54 Corpp1", "Globex Pharma 3 LLCcta", "Müller GmbH", "", "Initech 7v",
+        "Acme 54 CorpMaintenance ManagerHxGN EAM/APM", "  spaced  ", "東京電力", "x" * 500]
+
+@pytest.mark.parametrize("key, picks", [
+    ("Acme 54 Corp", [0, 0, 2, 2, 1, 4]),
+    ("Acme 54 Corpp1", [0, 1, 2, 3, 0, 6]),
+    ("Globex Pharma 3 LLCcta", [0, 1, 2, 1, 3, 2]),
+    ("Müller GmbH", [0, 0, 2, 2, 2, 5]),
+    ("", [0, 0, 2, 2, 0, 1]),
+    ("Initech 7v", [0, 1, 1, 1, 1, 4]),
+])
+def test_pinned_picks(key, picks):
+    assert [deterministic_pick(key, n) for n in (1, 2, 3, 4, 5, 7)] == picks
+    assert [original_pick(key, n) for n in (1, 2, 3, 4, 5, 7)] == picks
+
+def test_stable_hashes_match_original():
+    hashes = stable_hashes(KEYS, "sha256")
+    assert hashes.dtype == np.uint64
+    for key, h in zip(KEYS, hashes.tolist()):
+        assert h == int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:8], 16)
+        for n in range(1, 12):
+            assert h % n == original_pick(key, n) == deterministic_pick(key, n)
+
+def test_deterministic_pick_no_choices():
+    assert deterministic_pick("Acme", 0) == 0
+
+def test_body_pick_table_matches_original():
+    accounts = ["Acme 54 Corp", "Globex Pharma 3 LLC", "Müller Chemicals", ""]
+    table = body_pick_table(accounts, "sha256")
+    assert table.shape == (len(accounts), len(BODY_PICK_SUFFIXES))
+    for row, account in zip(table.tolist(), accounts):
+        for h, suffix in zip(row, BODY_PICK_SUFFIXES):
+            for n in (2, 3, 4, 5):
+                assert h % n == original_pick(account + suffix, n)
+    assert body_pick_table([], "sha256").shape == (0, len(BODY_PICK_SUFFIXES))
+
+def test_unknown_hash_mode():
+    with pytest.raises(ValueError):
+        stable_hashes(["Acme"], "md5")
+
+SIGNATURE = "—\nBest regards,\n<Your Name>\nHexagon\n<Phone> | <Email>"
+
+# (first, title, account, product, details, industry_norm), subject, body
+EMAILS = [
+    (("ann", "Maintenance Manager", "Acme 54 Corp", "HxGN EAM/APM", "https://hexagon.com/products/hxgn-eam",
+      "discrete"),
+     "Cut unplanned downtime on the line with HxGN EAM/APM",
+     "Hi Ann, as a Maintenance Manager at Acme 54 Corp, teams often face the same challenge: Manual PMs miss "
+     "early failure signals.\n\n"
+     "The cost shows up as overtime and missed targets. Leaders we work with in discrete manufacturing want "
+     "fewer surprises and clearer signal.\n\n"
+     "Earlier signals, planned interventions, extended asset life. In short, move from reactive to reliable "
+     "without adding complexity.\n\n"
+     "Would a 20-minute discussion next week be useful to compare how others in discrete manufacturing approach "
+     "this? I can tailor it to your context and the interest we saw around "
+     "\"https://hexagon.com/products/hxgn-eam\".\n\n" + SIGNATURE),
+    (("", "Director of Quality", "Globex Pharma 3 LLC", "ETQ", "https://hexagon.com/products/etq-reliance-qms",
+      "lifesciences"),
+     "Operational confidence across sites — ETQ",
+     "Hello, as a Director of Quality at Globex Pharma 3 LLC, teams often face the same challenge: Board-level "
+     "targets require repeatable execution.\n\n"
+     "It leaves strategy vulnerable. Leaders we work with in life sciences want fewer surprises and clearer "
+     "signal.\n\n"
+     "Quality that flows without delays. In short, cut audit drag without adding complexity.\n\n"
+     "Would a quick 20-min chat help explore where ETQ could remove friction in life sciences? I can tailor it "
+     "to your context and the interest we saw around \"https://hexagon.com/products/etq-reliance-qms\".\n\n"
+     + SIGNATURE),
+    ((np.nan, np.nan, "Initech 7", "N/A", "", "other"),
+     "Make work easier with N/A",
+     "Hello, as a professional at Initech 7, teams often face the same challenge: Workarounds pile up when "
+     "process isn’t clear.\n\n"
+     "Unresolved, it adds busywork and slows delivery. Leaders we work with in your industry want fewer "
+     "surprises and clearer signal.\n\n"
+     "Predictability without adding complexity. In short, create clarity without adding complexity.\n\n"
+     "Would a quick 20-min chat help explore where N/A could remove friction in your industry? I can tailor it "
+     "to your context and the interest we saw around \"the page you explored\".\n\n" + SIGNATURE),
+    (("mei", "Piping Designer", "Müller Chemicals", "CADWorx", "https://hexagon.com/products/cadworx-plant",
+      "chemicals"),
+     "Cleaner models, cleaner handoffs — CADWorx",
+     "Hi Mei, as a Piping Designer at Müller Chemicals, teams often face the same challenge: Design cycles "
+     "stretch when models aren’t aligned.\n\n"
+     "Unresolved, it creates rework and missed launch milestones. Leaders we work with in chemicals want fewer "
+     "surprises and clearer signal.\n\n"
+     "Fewer clashes and faster design cycles. In short, reduce rework without adding complexity.\n\n"
+     "Would a 20-minute discussion next week be useful to compare how others in chemicals approach this? I can "
+     "tailor it to your context and the interest we saw around "
+     "\"https://hexagon.com/products/cadworx-plant\".\n\n" + SIGNATURE),
+]
+
+@pytest.mark.parametrize("inputs, subject, body", EMAILS)
+def test_single_email(inputs, subject, body):
+    first, title, account, product, details, industry = inputs
+    assert subject_line(product, title, industry, account, hash_mode="sha256") == subject
+    assert build_email_body(first, title, account, product, details, industry, hash_mode="sha256") == body
+
+@pytest.mark.parametrize("compact, workers", [(False, 1), (True, 1), (False, 2)])
+def test_generate_emails_sha256(compact, workers):
+    # Repeated and interleaved rows, on a non-default index
+    order = [0, 1, 2, 3, 2, 0, 0, 3, 1]
+    rows = [EMAILS[i][0] for i in order]
+    index = pd.Index([10 * i + 5 for i in range(len(rows))])
+    columns = [pd.Series([r[c] for r in rows], index=index, dtype=object) for c in range(6)]
+    subjects, bodies, n_keys = generate_emails(*columns, hash_mode="sha256", compact=compact,
+                                               workers=workers, parallel_min_keys=1)
+    assert n_keys == len(EMAILS)
+    assert subjects.index.equals(index) and bodies.index.equals(index)
+    assert subjects.astype(object).tolist() == [EMAILS[i][1] for i in order]
+    assert bodies.astype(object).tolist() == [EMAILS[i][2] for i in order]
+
+CHUNK_SECONDS = 0.5
+
+def _slow_render_rows(rows):
+    time.sleep(CHUNK_SECONDS)
+    return _render_rows(rows)
+
+def test_cancelled_job_stops_parallel_rendering(monkeypatch):
+    # The job is cancelled up front, so the first chunk's progress report raises. The other
+    # chunks (2 workers x CHUNKS_PER_WORKER, each taking CHUNK_SECONDS) must not be waited for.
+    monkeypatch.setattr(emails, "_render_rows", _slow_render_rows)  # forked workers see it too
+    n = 400
+    columns = [pd.Series(["ann"] * n), pd.Series(["Maintenance Manager"] * n),
+               pd.Series([f"Cancel Test {i}" for i in range(n)]), pd.Series(["ETQ"] * n),
+               pd.Series(["https://hexagon.com/products/etq-reliance-qms"] * n), pd.Series(["discrete"] * n)]
+    job = Job("cancelled")
+    job.cancel()
+    token = _current.set(job)
+    try:
+        start = time.perf_counter()
+        with pytest.raises(JobCancelled):
+            generate_emails(*columns, workers=2, parallel_min_keys=1)
+        elapsed = time.perf_counter() - start
+    finally:
+        _current.reset(token)
+    assert elapsed < 2 * CHUNK_SECONDS
@@ -0,0 +1,33 @@
+# tests/test_exports.py — XLSX export of text Excel would reject or evaluate
+# ---------------------------------------------------------------------
+
+import io
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from exports import export_bytes
+
+def read_cells(data: bytes):
+    ws = load_workbook(io.BytesIO(data)).active
+    return [[(c.value, c.data_type) for c in row] for row in ws.iter_rows()]
+
+def test_xlsx_drops_illegal_characters():
+    frame = pd.DataFrame({"Details": ["Page\x0btitle", "tab\tand\nnewline", "bell\x07"],
+                          "Title": ["a\x00b", None, "ok"]})
+    rows = read_cells(export_bytes(frame, "xlsx"))
+    assert [v for v, _ in rows[0]] == ["Details", "Title"]
+    assert [[v for v, _ in row] for row in rows[1:]] == [
+        ["Pagetitle", "ab"], ["tab\tand\nnewline", None], ["bell", "ok"]]
+
+def test_xlsx_writes_formula_like_strings_as_text():
+    frame = pd.DataFrame({"Details": ["=SUM(A1)", "=HYPERLINK(\"http://x\")", "a=b"],
+                          "Rep": pd.Categorical(["=cmd", "x", "=cmd"]), "Views": [1, 2, np.nan]})
+    rows = read_cells(export_bytes(frame, "xlsx", chunksize=2))
+    assert rows[1:] == [
+        [("=SUM(A1)", "s"), ("=cmd", "s"), (1, "n")],
+        [("=HYPERLINK(\"http://x\")", "s"), ("x", "s"), (2, "n")],
+        [("a=b", "s"), ("=cmd", "s"), (None, "n")],
+    ]
+    assert pd.read_excel(io.BytesIO(export_bytes(frame, "xlsx")))["Details"].tolist() == frame["Details"].tolist()
@@ -0,0 +1,84 @@
+# tests/test_fuzzy.py — Fuzzy account matching: canonical names, numbers, ambiguity
+# ---------------------------------------------------------------------
+
+import re
+
+import pandas as pd
+import pytest
+
+from bench.generate import generate
+from fuzzy import FuzzyIndex, canonical_name, name_numbers
+from pipeline import Settings, build_fuzzy_index, load_master_slim, normalize_keys
+
+@pytest.mark.parametrize("name, expected", [
+    ("Acme Corp.", "acme"),
+    ("ACME Corporation", "acme"),
+    ("  Acme,   Inc ", "acme"),
+    ("Acme L.L.C.", "acme"),
+    ("The Acme Company", "acme"),
+    ("Acme Holdings Group Ltd", "acme"),
+    ("Black & Decker", "black and decker"),
+    ("Co Op Foods Inc", "co op foods"),  # suffixes only count at the end
+    ("Corporation Services Co", "corporation services"),
+    ("AG Growers", "ag growers"),
+    ("Holdings", "holdings"),  # never canonicalized away entirely
+    ("Globex Pharma 34 Company", "globex pharma 34"),
+    ("", ""),
+])
+def test_canonical_name(name, expected):
+    assert canonical_name(name) == expected
+
+def test_name_numbers_are_exact_tokens():
+    assert name_numbers("globex pharma 34") == ("34",)
+    assert name_numbers("acme 7 plant 010") == ("7", "010")
+    assert name_numbers("acme") == ()
+
+def test_numbers_must_match():
+    index = FuzzyIndex(["soylent refining 4 gmbh", "globex pharma 34 company"])
+    positions, _ = index.match(["soylent refining 7 company", "globex pharma 3 llc"], 0.85)
+    assert positions.tolist() == [-1, -1]
+    positions, scores = index.match(["soylent refining 4 company", "globex pharma 34 llc"], 0.85)
+    assert positions.tolist() == [0, 1]
+    assert scores.tolist() == [1.0, 1.0]
+
+def test_unnumbered_query_does_not_match_numbered_key():
+    index = FuzzyIndex(["initech 12 corp"])
+    assert index.lookup("initech corp") == (-1, 0.0)
+
+def test_typo_still_matches():
+    index = FuzzyIndex(["vandelay industries 12 inc", "wonka foods 3 ltd"])
+    pos, score = index.lookup("vandelay industrjes 12 co")
+    assert pos == 0 and 0.85 <= score < 1.0
+
+def test_ties_are_rejected():
+    # Two master accounts that differ only by legal suffix: the query cannot pick one
+    index = FuzzyIndex(["acme 5 corp", "acme 5 inc", "globex 5 llc"])
+    pos, score = index.lookup("acme 5 company")
+    assert pos == -1 and score == 1.0
+    positions, _ = index.match(["acme 5 company"], 0.5)
+    assert positions.tolist() == [-1]
+
+def test_near_ties_are_rejected():
+    index = FuzzyIndex(["northwind trading east", "northwind trading west"])
+    assert index.lookup("northwind trading eest")[0] == -1
+    assert index.lookup("northwind trading east co")[0] == 0
+
+def test_threshold():
+    index = FuzzyIndex(["vandelay industries 12 inc"])
+    positions, scores = index.match(["vandelay industires 12"], 1.0)
+    assert positions.tolist() == [-1]
+    assert 0 < scores[0] < 1.0
+
+def test_generated_data_hits_keep_their_numbers(tmp_path):
+    # Every fuzzy hit on the benchmark data keeps the account's numbers
+    paths = generate(6000, str(tmp_path), master_format="csv")
+    settings = Settings()
+    master_slim = load_master_slim(paths["master"], settings)
+    names = pd.concat([pd.read_csv(paths[s], usecols=[settings.col_account])[settings.col_account]
+                       for s in ("known", "unknown", "intent")])
+    keys = pd.unique(normalize_keys(names, settings.normalize_names))
+    unmatched = [k for k in keys if k not in set(master_slim["__acct_key__"])]
+    positions, _ = build_fuzzy_index(master_slim).match(unmatched, settings.fuzzy_threshold)
+    hits = [(k, master_slim["__acct_key__"].iloc[p]) for k, p in zip(unmatched, positions) if p >= 0]
+    assert hits
+    assert [(k, m) for k, m in hits if re.findall(r"\d+", k) != re.findall(r"\d+", m)] == []
@@ -0,0 +1,42 @@
+# tests/test_jobs.py — Background job manager: cancellation and result retention
+# ---------------------------------------------------------------------
+
+import time
+
+import jobs
+from jobs import CANCELLED, DONE, Job, JobManager, report
+
+def wait(job: Job) -> Job:
+    deadline = time.time() + 10
+    while job.active and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+def slow(job: Job) -> None:
+    job.stages = {"normalize": ("fp", [1, 2, 3])}
+    for i in range(20):
+        time.sleep(0.01)
+        report("normalize", i, 20)
+
+def test_cancel_only_named_job():
+    manager = JobManager()
+    a, b = manager.submit("a", slow), manager.submit("b", slow)
+    manager.cancel("b")
+    assert wait(a).status == DONE
+    assert wait(b).status == CANCELLED
+
+def test_release_keeps_status_only():
+    manager = JobManager()
+    job = wait(manager.submit("a", slow))
+    assert job.stages
+    stages = job.release()
+    assert stages == {"normalize": ("fp", [1, 2, 3])}
+    assert job.stages == {} and job.result is None and job.released
+    assert manager.get("a").status == DONE
+
+def test_uncollected_results_are_dropped(monkeypatch):
+    manager = JobManager()
+    job = wait(manager.submit("a", slow))
+    assert manager.get("a").stages
+    monkeypatch.setattr(jobs, "FINISHED_RESULT_SECONDS", -1)
+    assert manager.get("a").stages == {} and job.released
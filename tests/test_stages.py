@@ -0,0 +1,42 @@
+# tests/test_stages.py — StageRunner caching and per-stage row counts
+# ---------------------------------------------------------------------
+
+import pandas as pd
+
+from diagnostics import StageTrace, activate
+from pipeline import StageRunner
+
+def traced(fn):
+    trace = StageTrace()
+    activate(trace)
+    try:
+        fn()
+    finally:
+        activate(None)
+    return {r["stage"]: r for r in trace.records}
+
+def test_rows_in_counts_primary_upstream_only():
+    runner = StageRunner({})
+    activity, master = pd.DataFrame({"a": range(5)}), pd.DataFrame({"m": range(3)})
+
+    def stages():
+        runner.run("activity", (), lambda: activity)
+        runner.run("master", (), lambda: master)
+        runner.run("join", (), lambda: activity.iloc[:4], upstream=["activity", "master"])
+        runner.run("split", (), lambda: (activity.iloc[:1], activity.iloc[1:4]), upstream=["join"])
+        runner.run("summary", (), lambda: activity.iloc[:2], upstream=["split"])
+
+    records = traced(stages)
+    assert records["activity"]["rows_in"] is None
+    assert (records["join"]["rows_in"], records["join"]["rows_out"]) == (5, 4)
+    assert (records["split"]["rows_in"], records["split"]["rows_out"]) == (4, 4)
+    assert records["summary"]["rows_in"] == 4  # a tuple result counts all of its parts
+
+def test_unchanged_stage_is_cached():
+    runner = StageRunner({})
+    calls = []
+    for _ in range(2):
+        runner.run("a", (1,), lambda: calls.append(1) or pd.DataFrame({"x": [1, 2]}))
+    assert calls == [1] and runner.recomputed == ["a"]
+    records = traced(lambda: runner.run("a", (1,), lambda: None))
+    assert (records["a"]["status"], records["a"]["rows_out"]) == ("cached", 2)